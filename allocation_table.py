@@ -0,0 +1,161 @@
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLineEdit, QTableView, QHeaderView, QAbstractItemView
+import numpy as np
+from simulation import UploadSimulation
+from sim_process import AVG_LATENCY, P95_LATENCY, MAX_RATE, BACKLOG
+
+# Column title, source array ('current' allocation or 'stats') and column in it, display format
+COLUMNS = [
+    ('ONU', None, None, None),
+    ('FT1', 'current', 0, '{:.2f}'),
+    ('FT2', 'current', 1, '{:.2f}'),
+    ('FT3', 'current', 2, '{:.2f}'),
+    ('FT4', 'current', 3, '{:.2f}'),
+    ('Backlog', 'stats', BACKLOG, '{:.2f}'),
+    ('Avg Latency', 'stats', AVG_LATENCY, '{:.4g}'),
+    ('P95 Latency', 'stats', P95_LATENCY, '{:.4g}'),
+    ('Max Rate', 'stats', MAX_RATE, '{:.2f}'),
+]
+
+class AllocationTableModel(QAbstractTableModel):
+    """
+    Live per-ONU view of a simulation, read straight from the arrays UploadSimulation polls into.
+
+    Sorting and filtering only reorder an index array (view row -> ONU index); cells are formatted
+    on demand, so the view only ever touches the rows on screen.
+    """
+
+    def __init__(self, simulation: UploadSimulation, parent=None):
+        super().__init__(parent)
+        self.simulation = simulation
+        self.onu_ids: list[str] = list(simulation.onu_ids)
+        self.rows = np.arange(len(self.onu_ids))
+        self.sort_column: int = -1
+        self.sort_order = Qt.AscendingOrder
+        self.filter_text: str = ''
+        self.filtered = np.arange(len(self.onu_ids))  # ONUs matching filter_text, in network order
+        self.shown: tuple[int, int] = (0, 0)  # Cycles and what-if updates already on screen
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return COLUMNS[section][0]
+        return None
+
+    def column(self, column: int) -> np.ndarray:
+        # One column of the simulation arrays, as a view
+        _, source, index, _ = COLUMNS[column]
+        return getattr(self.simulation, source)[:, index]
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        onu = self.rows[index.row()]
+        if role == Qt.DisplayRole:
+            if index.column() == 0:
+                return self.onu_ids[onu]
+            return COLUMNS[index.column()][3].format(self.column(index.column())[onu])
+        if role == Qt.TextAlignmentRole and index.column() > 0:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def _ordered_rows(self) -> np.ndarray:
+        rows = self.filtered
+        if self.sort_column == 0:
+            rows = np.array(sorted(rows, key=self.onu_ids.__getitem__), dtype=np.int64)
+        elif self.sort_column > 0:
+            # Stable, so ONUs with equal values keep their order between refreshes
+            rows = rows[np.argsort(self.column(self.sort_column)[rows], kind='stable')]
+        if self.sort_order == Qt.DescendingOrder and self.sort_column >= 0:
+            rows = rows[::-1]
+        return rows
+
+    def _relayout(self):
+        # Keeps selections and the current index on the same ONUs after rows move
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        onus = [self.rows[index.row()] for index in persistent]
+        self.rows = self._ordered_rows()
+        position = {onu: row for row, onu in enumerate(self.rows.tolist())} if persistent else {}
+        self.changePersistentIndexList(persistent, [self.index(position[onu], index.column()) if onu in position else QModelIndex() for onu, index in zip(onus, persistent)])
+        self.layoutChanged.emit()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.sort_column = column
+        self.sort_order = order
+        self._relayout()
+
+    def set_filter(self, text: str):
+        self.filter_text = text.strip().lower()
+        self.filtered = np.array([i for i, onu_id in enumerate(self.onu_ids) if self.filter_text in onu_id.lower()], dtype=np.int64)
+        self._relayout()
+
+    def refresh(self):
+        # Called on a timer; does nothing until the simulation has published new cycles or what-if allocations
+        published = (self.simulation.cycles_read, self.simulation.what_if_read)
+        if published == self.shown or not len(self.rows):
+            return
+        self.shown = published
+        if self.sort_column > 0:
+            self._relayout()
+        else:
+            self.dataChanged.emit(self.index(0, 1), self.index(len(self.rows) - 1, len(COLUMNS) - 1), [Qt.DisplayRole])
+
+class AllocationTable(QWidget):
+    """
+    Filterable, sortable table of the current allocation and statistics of every ONU.
+
+    The view is refreshed at most every refresh_interval ms, however fast the simulation runs.
+    """
+
+    def __init__(self, refresh_interval: int = 500, parent=None):
+        super().__init__(parent)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText("Filter ONUs")
+        self.filter_edit.textChanged.connect(self.set_filter)
+        layout.addWidget(self.filter_edit)
+
+        self.view = QTableView()
+        self.view.setSortingEnabled(True)
+        self.view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.view.setAlternatingRowColors(True)
+        # Fixed row heights and no resize-to-contents, so no row is measured before it is visible
+        self.view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.view.verticalHeader().setDefaultSectionSize(self.view.fontMetrics().height() + 6)
+        self.view.verticalHeader().setVisible(False)
+        self.view.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.view.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        layout.addWidget(self.view)
+
+        self.model: AllocationTableModel | None = None
+        self.timer = QTimer(self)
+        self.timer.setInterval(refresh_interval)
+        self.timer.timeout.connect(self.refresh)
+
+    def set_simulation(self, simulation: UploadSimulation):
+        previous = self.model
+        self.model = AllocationTableModel(simulation, self)
+        self.model.set_filter(self.filter_edit.text())
+        self.view.setModel(self.model)
+        if previous:
+            previous.deleteLater()
+        # The new model keeps the sort picked for the previous run
+        header = self.view.horizontalHeader()
+        self.model.sort(header.sortIndicatorSection(), header.sortIndicatorOrder())
+        self.timer.start()
+
+    def set_filter(self, text: str):
+        if self.model:
+            self.model.set_filter(text)
+
+    def refresh(self):
+        if self.model:
+            self.model.refresh()
@@ -0,0 +1,68 @@
+import random
+import sys
+from dba import ONU, DBA_POLICIES
+from equivalence import ENGINES, check_equivalence
+
+# name, ONUs, ONUs per group, load multiplier, cycles
+SCENARIOS = [
+    ("small", 8, 2, 1.0, 200),
+    ("busy", 256, 32, 1.0, 60),
+    ("residential", 2048, 32, 0.02, 60),
+]
+
+def build_topology(onu_count: int, group_size: int, seed: int = 0) -> tuple[list[ONU], list[list[str]]]:
+    # Reproducible mix of ONU rates and traffic profiles
+    rng = random.Random(seed)
+    profiles = [{1:0, 2:0.6, 3:0.2, 4:0.2}, {1:0, 2:0.8, 3:0.0, 4:0.2}, {1:0.2, 2:0.4, 3:0.2, 4:0.2}, {1:0, 2:0.7, 3:0.2, 4:0.1}]
+    ONUS = [ONU(f"ONU{i+1}", 10, rng.choice([1000, 2000, 5000]), dict(rng.choice(profiles))) for i in range(onu_count)]
+    onu_ids = [onu.onu_id for onu in ONUS]
+    return ONUS, [onu_ids[i:i + group_size] for i in range(0, onu_count, group_size)]
+
+def run(engines: list[str] | None = None, policies: list[str] | None = None, seed: int = 0) -> bool:
+    """
+    Times every engine against the reference on every scenario, checking their allocations match.
+
+    A scenario in which the reference never enqueued any data fails too: its allocations are all
+    zero and would match whatever the engine does. With no other engine registered the reference
+    is checked against itself, which only tells whether a seeded run is reproducible, so nothing
+    is timed against it.
+
+    Returns:
+        bool: Whether every engine matched the reference in every cycle of a scenario with traffic.
+    """
+    engines = engines or [engine for engine in ENGINES if engine != "reference"] or ["reference"]
+    policies = policies or list(DBA_POLICIES)
+    equivalent = True
+    reproducibility_only = engines == ["reference"]
+    if reproducibility_only:
+        print("Only the reference engine is run: this checks that seeded runs are reproducible, nothing is timed against it\n")
+        print(f"{'Scenario':<12} {'Policy':<14} {'ms/cycle':>9}  Result")
+    else:
+        print(f"{'Scenario':<12} {'Policy':<14} {'Engine':<12} {'Ref ms/cycle':>12} {'ms/cycle':>9} {'Speedup':>8}  Result")
+    for name, onu_count, group_size, load, cycles in SCENARIOS:
+        ONUS, groups = build_topology(onu_count, group_size, seed)
+        for policy in policies:
+            for engine in engines:
+                report = check_equivalence(engine, ONUS, groups, 0.025, policy=policy, seed=seed, load=load, cycles=cycles)
+                reference_ms = report.reference_time / report.cycles * 1000
+                engine_ms = report.candidate_time / report.cycles * 1000
+                if not report.equivalent:
+                    result = f"DIVERGES at {report.divergence}"
+                elif not report.arrived:
+                    result = "NO TRAFFIC"
+                else:
+                    result = f"OK, {report.arrived:.4g} arrived"
+                if reproducibility_only:
+                    print(f"{name:<12} {policy:<14} {reference_ms:>9.2f}  {result}")
+                elif engine == "reference":
+                    # Timing the reference against itself says nothing
+                    print(f"{name:<12} {policy:<14} {engine:<12} {reference_ms:>12.2f} {'-':>9} {'-':>8}  {result}")
+                else:
+                    print(f"{name:<12} {policy:<14} {engine:<12} {reference_ms:>12.2f} {engine_ms:>9.2f} {reference_ms/engine_ms:>7.2f}x  {result}")
+                equivalent = equivalent and report.equivalent and report.arrived > 0
+    return equivalent
+
+
+if __name__ == "__main__":
+    # Non-zero exit status when an engine no longer matches the reference
+    sys.exit(0 if run(sys.argv[1:] or None) else 1)
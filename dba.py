@@ -1,5 +1,12 @@
+import copy
+import math
 import random
 from enum import Enum
+from typing import Callable
+
+# Relative slack when packets are fitted into an allocation, so one computed from sums of the same
+# packet sizes is not an ulp short of them
+FIT_TOLERANCE = 1e-9
 
 class TCont(Enum):
     T1 = 1
@@ -15,7 +22,7 @@ class Packet:
         self.transmitted: bool = False  # Add this line
         
 class ONU:
-    def __init__(self, onu_id, buffer_size, max_bw, proportions: dict[TCont,float] | None = None):
+    def __init__(self, onu_id, buffer_size, max_bw, proportions: dict[TCont,float] | None = None, rtt: float = 0):
         self.onu_id = onu_id
         self.buffer_size: int = buffer_size
         self.max_bw: float = max_bw
@@ -28,7 +35,13 @@ class ONU:
         self.queue: dict[TCont,list[Packet]] = {1: [], 2: [], 3: [], 4: []}
         self.total_latency: float = 0
         self.packets_transmitted: int = 0
+        # Queueing delay (cycles between arrival and transmission), arrived and untransmitted data, per T-Cont
+        self.tcont_delay: dict[TCont,float] = {1: 0, 2: 0, 3: 0, 4: 0}
+        self.tcont_packets: dict[TCont,int] = {1: 0, 2: 0, 3: 0, 4: 0}
+        self.arrived: dict[TCont,float] = {1: 0, 2: 0, 3: 0, 4: 0}
+        self.pending: dict[TCont,float] = {1: 0, 2: 0, 3: 0, 4: 0}
         self.max_allocated_bw: float = 0
+        self.rtt: float = rtt  # Round-trip time to the OLT, added to every packet latency
         
     def update_HCT(self):
         for t in TCont:
@@ -40,6 +53,21 @@ class ONU:
             # Update avg_HCT
             self.avg_HCT[t] = sum(self.HCT[t])/len(self.HCT[t]) if len(self.HCT[t]) > 0 else 0
 
+    def pad_HCT(self, cycles: int):
+        # Catches up on HCT updates skipped while idle, every one of them saw empty queues.
+        # The window never holds more than buffer_size+1 entries, so older cycles make no difference
+        for _ in range(min(cycles, self.buffer_size + 1)):
+            for t in self.HCT:
+                if len(self.HCT[t]) >= self.buffer_size:
+                    self.HCT[t] = self.HCT[t][-self.buffer_size:]
+                self.HCT[t].append(0)
+        for t in self.HCT:
+            self.avg_HCT[t] = sum(self.HCT[t])/len(self.HCT[t]) if len(self.HCT[t]) > 0 else 0
+
+    def is_idle(self) -> bool:
+        # Nothing waiting to be sent and nothing left in the HCT window: every policy input is zero
+        return not any(self.queue.values()) and not any(self.avg_HCT.values())
+
     def get_RT(self):
         RT: dict[TCont,int] = {}
         for t in TCont:
@@ -48,21 +76,101 @@ class ONU:
         return RT
 
 class DBA_Simulator:
-    def __init__(self, ONUS: list[ONU], groups: list[list[str]], Tm: float):
+    def __init__(self, ONUS: list[ONU], groups: list[list[str]], Tm: float, policy: str = "bexcess", load: float = 1.0, rng: random.Random | None = None, track_active: bool = False):
+        if policy not in DBA_POLICIES:
+            raise ValueError(f"Unknown DBA policy '{policy}'. Available: {', '.join(DBA_POLICIES)}")
         self.N: int = len(ONUS)  # number of ONUs
         self.groups: list[list[str]] = groups
         self.Tm: float = Tm
+        self.policy: str = policy
+        self.load: float = load  # Multiplier on the number of packets generated per cycle
+        self.rng = rng if rng is not None else random  # A seeded random.Random makes runs reproducible
         # self.num_groups = num_groups
         self.ONUs: dict[str,ONU] = {}
         for onu in ONUS:
             self.ONUs[onu.onu_id] = onu
         self.current_time: int = 0
+        self.group_index: dict[str,int] = {}
+        self.group_position: dict[str,int] = {}  # Position of each ONU within its group
+        self.group_max_bw: list[float] = []
+        self._index_groups()
+        # With track_active only the busy ONUs of each group go through the HCT update and the
+        # policy; idle ones are skipped until traffic arrives. It pays off when most ONUs are idle,
+        # at high load the bookkeeping costs more than it saves. Allocations are the same either way
+        self.track_active: bool = track_active
+        self.active: list[set[str]] = [set() for _ in self.groups]
+        self.idle_since: dict[str,int] = {}  # Idle ONU -> cycle of its last HCT update
+        for onu_id, onu in self.ONUs.items():
+            if onu.is_idle():
+                self.idle_since[onu_id] = self.current_time
+            else:
+                self.active[self.group_index[onu_id]].add(onu_id)
 
-    def traffic_generator(self):
+    def snapshot(self, rng: random.Random | None = None) -> 'DBA_Simulator':
+        # Independent copy of the queues, HCT and statistics, e.g. to reuse a warmed-up state
+        simulator = DBA_Simulator(copy.deepcopy(list(self.ONUs.values())), copy.deepcopy(self.groups), self.Tm, policy=self.policy, load=self.load, rng=rng, track_active=self.track_active)
+        simulator.current_time = self.current_time
+        simulator.idle_since = dict(self.idle_since)
+        return simulator
+
+    def _index_groups(self):
+        self.group_index = {onu_id: i for i, group in enumerate(self.groups) for onu_id in group}
+        self.group_position = {onu_id: j for group in self.groups for j, onu_id in enumerate(group)}
+        self.group_max_bw = [sum(self.ONUs[onu_id].max_bw for onu_id in group) for group in self.groups]
+
+    def update_onu(self, onu_id: str, max_bw: float | None = None, proportions: dict[TCont,float] | None = None, group: int | None = None) -> dict[str,dict[TCont,float]]:
+        """
+        Changes the parameters of one ONU during a run, keeping every queue and HCT history.
+
+        Only the groups the ONU belongs to before and after the change are re-evaluated; every
+        other group keeps the allocation simulate_cycle last returned for it.
+
+        Args:
+            onu_id (str): ONU to update.
+            max_bw (float | None): New maximum bandwidth.
+            proportions (dict[TCont,float] | None): New traffic proportions per T-Cont.
+            group (int | None): Index of the group to move the ONU to, len(groups) opens a new group.
+
+        Returns:
+            dict[str,dict[TCont,float]]: What-if allocations of the ONUs in the affected groups.
+        """
+        if group is not None and not 0 <= group <= len(self.groups):
+            raise ValueError(f"Group {group} does not exist.")
+        onu = self.ONUs[onu_id]
+        affected = {self.group_index[onu_id]}
+        if max_bw is not None:
+            onu.max_bw = max_bw
+        if proportions is not None:
+            onu.proportions = dict(proportions)
+        if group is not None and group != self.group_index[onu_id]:
+            if group == len(self.groups):
+                self.groups.append([])
+                self.active.append(set())
+            self.groups[self.group_index[onu_id]].remove(onu_id)
+            self.groups[group].append(onu_id)
+            if onu_id in self.active[self.group_index[onu_id]]:
+                self.active[self.group_index[onu_id]].discard(onu_id)
+                self.active[group].add(onu_id)
+            affected.add(group)
+        self._index_groups()
+
+        allocations: dict[str,dict[TCont,float]] = {}
+        for i in sorted(affected):
+            allocations.update(self._allocate(i))
+        return allocations
+
+    def generate_traffic(self) -> dict[str,dict[TCont,list[float]]]:
+        traffic: dict[str,dict[TCont,list[float]]] = {}
         # For each ONU
         for onu_id, onu in self.ONUs.items():
             # Total traffic to be generated for this ONU
-            total_packets = random.randint(0,10)
+            total_packets = self.rng.randint(0,10)
+            if self.load != 1:
+                # Stochastic rounding keeps the mean offered load proportional to load, even below one packet
+                scaled = total_packets * self.load
+                total_packets = math.floor(scaled)
+                if self.rng.random() < scaled - total_packets:
+                    total_packets += 1
             # Generate traffic according to the proportions
             proportions = onu.proportions
             total_proportion = sum(proportions.values())
@@ -74,102 +182,72 @@ class DBA_Simulator:
             
             # Distribute remaining packets randomly
             for _ in range(remaining_packets):
-                t = random.choice([2,3,4])
+                t = self.rng.choice([2,3,4])
                 num_packets_per_TCont[t] +=1
-            # Generate the packets
+            # Generate the packet sizes
+            traffic[onu_id] = {}
             for t in TCont:
                 t = t.value
-                for _ in range(num_packets_per_TCont[t]):
-                    pkt_size = random.randint(1, onu.max_bw*10)/1000
-                    packet = Packet(pkt_size, self.current_time)
-                    self.ONUs[onu_id].queue[t].append(packet)
+                traffic[onu_id][t] = [self.rng.randint(1, onu.max_bw*10)/1000 for _ in range(num_packets_per_TCont[t])]
+        return traffic
+
+    def enqueue_traffic(self, traffic: dict[str,dict[TCont,list[float]]]):
+        for onu_id, sizes_per_TCont in traffic.items():
+            onu = self.ONUs[onu_id]
+            for t, sizes in sizes_per_TCont.items():
+                for pkt_size in sizes:
+                    onu.queue[t].append(Packet(pkt_size, self.current_time))
+                if sizes and onu_id in self.idle_since:
+                    # Back in the active set; the skipped HCT updates are replayed at its next DBA
+                    self.active[self.group_index[onu_id]].add(onu_id)
+                onu.arrived[t] += sum(sizes)
+                onu.pending[t] += sum(sizes)
+
+    def traffic_generator(self):
+        self.enqueue_traffic(self.generate_traffic())
 
     def DBA(self):
         allocations: dict[str,dict[TCont,float]] = {}
-        for group in self.groups:
+        for i, group in enumerate(self.groups):
             # Update HCT for ONUs in this group
-            for onu_id in group:
-                self.ONUs[onu_id].update_HCT()
-            # Initialize data structures
-            group_PT: dict[str,dict[TCont,int]] = {}
-            group_FT: dict[str,dict[TCont,float]] = {}
-            group_allocations = {}
-            group_Bexcess = 0
-            lightly_loaded_onus: list[str] = []
-            heavily_loaded_onus: list[str] = []
-            heavy_loads: dict[str,float] = {}
-            # First pass: Compute PT and initial FT allocations
-            for onu_id in group:
-                Bmax = self.ONUs[onu_id].max_bw
-                RT = self.ONUs[onu_id].get_RT()
-                HCT = self.ONUs[onu_id].avg_HCT
-                
-                if RT[TCont.T1.value] != 0:
-                    group_PT[onu_id] = {1: RT[TCont.T1.value], 2: 0, 3: 0, 4: 0}
-                    group_FT[onu_id] = {1: Bmax, 2: 0, 3: 0, 4: 0}
-                    continue
-                
-                # Compute Delta_PT
-                Delta_PT: dict[TCont,int] = {}
-                for t in [2,3,4]:
-                    if t == TCont.T2.value:
-                        Delta_PT[2] = 0
-                    else:
-                        Delta_PT[t] = RT[t] - HCT[t]
-                # Compute PT
-                PT: dict[TCont,int] = {1:0}
-                for t in [2,3,4]:
-                    PT[t] = RT[t] + Delta_PT[t]
-                total_PT = sum(PT.values())
-                group_PT[onu_id] = PT
-                # Compute initial FT (First Value)
-                FT: dict[int,float] = {1:0}
-                Bmin_remaining = Bmax
-                FT[2] = min(Bmin_remaining, PT[2])
-                Bmin_remaining -= FT[2]
-                FT[3] = min(Bmin_remaining, PT[3])
-                Bmin_remaining -= FT[3]
-                FT[4] = min(Bmin_remaining, PT[4])
-                allocated_bw: float = sum(FT.values())
-                group_FT[onu_id] = FT
-                # Decide whether ONU is lightly loaded or heavily loaded
-                if allocated_bw < Bmax:
-                    # Lightly loaded ONU
-                    group_Bexcess += Bmax - allocated_bw
-                    lightly_loaded_onus.append(onu_id)
-                elif total_PT > Bmax:
-                    # Heavily loaded ONU
-                    excess_demand = total_PT - Bmax
-                    heavy_loads[onu_id] = excess_demand
-                    heavily_loaded_onus.append(onu_id)
-            # Redistribute Bexcess among heavily loaded ONUs
-            total_heavy_load = sum(heavy_loads.values())
-            if total_heavy_load > 0 and group_Bexcess > 0:
-                for onu_id in heavily_loaded_onus:
-                    # Calculate share of Bexcess
-                    share = (heavy_loads[onu_id] / total_heavy_load) * group_Bexcess
-                    PT = group_PT[onu_id]
-                    FT = group_FT[onu_id]
-                    # Distribute share among T-Conts
-                    # Bexcess is first assigned to T-Cont 2, then 3, then 4
-                    Bexcess_remaining = share
-                    for t in [2,3,4]:
-                        BW_needed = PT[t] - FT[t]
-                        if BW_needed > 0:
-                            alloc = min(Bexcess_remaining, BW_needed)
-                            FT[t] += alloc
-                            Bexcess_remaining -= alloc
-                            if Bexcess_remaining <= 0:
-                                break
-                    group_FT[onu_id] = FT
-            # Store allocations
-            for onu_id in group:
-                allocations[onu_id] = group_FT[onu_id]
+            if self.track_active:
+                for onu_id in list(self.active[i]):
+                    self._update_active_HCT(i, onu_id)
+            else:
+                for onu_id in group:
+                    self.ONUs[onu_id].update_HCT()
+            allocations.update(self._allocate(i))
         return allocations
 
-    def simulate_cycle(self):
+    def _update_active_HCT(self, i: int, onu_id: str):
+        onu = self.ONUs[onu_id]
+        since = self.idle_since.pop(onu_id, None)
+        if since is not None:
+            onu.pad_HCT(self.current_time - since - 1)
+        onu.update_HCT()
+        if onu.is_idle():
+            self.active[i].discard(onu_id)
+            self.idle_since[onu_id] = self.current_time
+
+    def _allocate(self, i: int) -> dict[str,dict[TCont,float]]:
+        # Policies registered with skip_idle only see the busy ONUs of the group, in group order,
+        # and the summed maximum bandwidth of the idle ones; idle ONUs get no allocation
+        policy = DBA_POLICIES[self.policy]
+        if not self.track_active or self.policy not in DBA_SKIP_IDLE:
+            return policy(self, self.groups[i])
+        if len(self.active[i]) == len(self.groups[i]):
+            return policy(self, self.groups[i], 0)
+        busy = sorted(self.active[i], key=self.group_position.__getitem__)
+        idle_bw = self.group_max_bw[i] - sum(self.ONUs[onu_id].max_bw for onu_id in busy)
+        return policy(self, busy, idle_bw)
+
+    def simulate_cycle(self, traffic: dict[str,dict[TCont,list[float]]] | None = None):
         self.current_time += 1
-        self.traffic_generator()
+        if traffic is None:
+            self.traffic_generator()
+        else:
+            # Traffic shared with other simulators, see ComparativeSimulator
+            self.enqueue_traffic(traffic)
         allocations = self.DBA()
         
         # For each ONU, process transmitted packets based on allocated bandwidth
@@ -178,16 +256,23 @@ class DBA_Simulator:
             for t in TCont:
                 t_value = t.value
                 bw_allocated = allocation.get(t_value, 0)
+                fit_limit = bw_allocated * (1 + FIT_TOLERANCE)
                 transmitted_data = 0
                 for packet in onu.queue[t_value]:
-                    if not packet.transmitted and transmitted_data + packet.size <= bw_allocated:
+                    if not packet.transmitted and transmitted_data + packet.size <= fit_limit:
                         transmitted_data += packet.size
-                        latency = packet.size / bw_allocated
+                        latency = packet.size / bw_allocated + onu.rtt
                         onu.total_latency += latency
                         onu.packets_transmitted += 1
+                        onu.tcont_delay[t_value] += self.current_time - packet.arrival_time
+                        onu.tcont_packets[t_value] += 1
+                        onu.pending[t_value] -= packet.size
                         packet.transmitted = True  # Mark packet as transmitted
                     if transmitted_data >= bw_allocated:
                         break
+                if transmitted_data > 0:
+                    # Transmitted packets leave the queue, so RT and the HCT only count data still waiting
+                    onu.queue[t_value] = [packet for packet in onu.queue[t_value] if not packet.transmitted]
         
                 total_allocated_bw = sum(allocation.values())
                 if total_allocated_bw > onu.max_allocated_bw:
@@ -195,8 +280,177 @@ class DBA_Simulator:
         return allocations
 
 
-def simulate():
-    # Usage example
+# DBA policies
+# Every policy receives the simulator and one group of ONU ids (HCT already updated for this cycle)
+# and returns the allocation of each ONU in the group as {onu_id: {T-Cont: bandwidth}}.
+# Policies registered with skip_idle=True give nothing to idle ONUs (empty queues and HCT) and are
+# only called with the busy ONUs of the group, plus the total maximum bandwidth of the idle ones.
+DBA_POLICIES: dict[str,Callable[...,dict[str,dict[TCont,float]]]] = {}
+DBA_SKIP_IDLE: set[str] = set()
+
+def register_dba_policy(name: str, skip_idle: bool = False):
+    def decorator(policy):
+        DBA_POLICIES[name] = policy
+        if skip_idle:
+            DBA_SKIP_IDLE.add(name)
+        return policy
+    return decorator
+
+@register_dba_policy("bexcess", skip_idle=True)
+def bexcess_policy(simulator: DBA_Simulator, group: list[str], idle_bw: float = 0) -> dict[str,dict[TCont,float]]:
+    # PT/FT allocation with Bexcess redistribution from lightly to heavily loaded ONUs
+    # Initialize data structures
+    group_PT: dict[str,dict[TCont,int]] = {}
+    group_FT: dict[str,dict[TCont,float]] = {}
+    # Idle ONUs are lightly loaded and give up their whole maximum bandwidth
+    group_Bexcess = idle_bw
+    lightly_loaded_onus: list[str] = []
+    heavily_loaded_onus: list[str] = []
+    heavy_loads: dict[str,float] = {}
+    # First pass: Compute PT and initial FT allocations
+    for onu_id in group:
+        Bmax = simulator.ONUs[onu_id].max_bw
+        RT = simulator.ONUs[onu_id].get_RT()
+        HCT = simulator.ONUs[onu_id].avg_HCT
+
+        if RT[TCont.T1.value] != 0:
+            group_PT[onu_id] = {1: RT[TCont.T1.value], 2: 0, 3: 0, 4: 0}
+            group_FT[onu_id] = {1: Bmax, 2: 0, 3: 0, 4: 0}
+            continue
+
+        # Compute Delta_PT
+        Delta_PT: dict[TCont,int] = {}
+        for t in [2,3,4]:
+            if t == TCont.T2.value:
+                Delta_PT[2] = 0
+            else:
+                Delta_PT[t] = RT[t] - HCT[t]
+        # Compute PT
+        PT: dict[TCont,int] = {1:0}
+        for t in [2,3,4]:
+            # A falling trend can not predict less than nothing to send
+            PT[t] = max(RT[t] + Delta_PT[t], 0)
+        total_PT = sum(PT.values())
+        group_PT[onu_id] = PT
+        # Compute initial FT (First Value)
+        FT: dict[int,float] = {1:0}
+        Bmin_remaining = Bmax
+        FT[2] = min(Bmin_remaining, PT[2])
+        Bmin_remaining -= FT[2]
+        FT[3] = min(Bmin_remaining, PT[3])
+        Bmin_remaining -= FT[3]
+        FT[4] = min(Bmin_remaining, PT[4])
+        allocated_bw: float = sum(FT.values())
+        group_FT[onu_id] = FT
+        # Decide whether ONU is lightly loaded or heavily loaded
+        if allocated_bw < Bmax:
+            # Lightly loaded ONU
+            group_Bexcess += Bmax - allocated_bw
+            lightly_loaded_onus.append(onu_id)
+        elif total_PT > Bmax:
+            # Heavily loaded ONU
+            excess_demand = total_PT - Bmax
+            heavy_loads[onu_id] = excess_demand
+            heavily_loaded_onus.append(onu_id)
+    # Redistribute Bexcess among heavily loaded ONUs
+    total_heavy_load = sum(heavy_loads.values())
+    if total_heavy_load > 0 and group_Bexcess > 0:
+        for onu_id in heavily_loaded_onus:
+            # Calculate share of Bexcess
+            share = (heavy_loads[onu_id] / total_heavy_load) * group_Bexcess
+            PT = group_PT[onu_id]
+            FT = group_FT[onu_id]
+            # Distribute share among T-Conts
+            # Bexcess is first assigned to T-Cont 2, then 3, then 4
+            Bexcess_remaining = share
+            for t in [2,3,4]:
+                BW_needed = PT[t] - FT[t]
+                if BW_needed > 0:
+                    alloc = min(Bexcess_remaining, BW_needed)
+                    FT[t] += alloc
+                    Bexcess_remaining -= alloc
+                    if Bexcess_remaining <= 0:
+                        break
+            group_FT[onu_id] = FT
+    # Store allocations
+    return {onu_id: group_FT[onu_id] for onu_id in group}
+
+
+@register_dba_policy("ipact_limited", skip_idle=True)
+def ipact_limited_policy(simulator: DBA_Simulator, group: list[str], idle_bw: float = 0) -> dict[str,dict[TCont,float]]:
+    # IPACT limited service: every ONU gets what it reports, capped at its maximum window
+    allocations: dict[str,dict[TCont,float]] = {}
+    for onu_id in group:
+        onu = simulator.ONUs[onu_id]
+        RT = onu.get_RT()
+        FT: dict[TCont,float] = {}
+        B_remaining = onu.max_bw
+        # The window is filled in T-Cont priority order
+        for t in TCont:
+            t = t.value
+            FT[t] = min(B_remaining, RT[t])
+            B_remaining -= FT[t]
+        allocations[onu_id] = FT
+    return allocations
+
+@register_dba_policy("giant")
+def giant_policy(simulator: DBA_Simulator, group: list[str]) -> dict[str,dict[TCont,float]]:
+    # GIANT-style: T-Cont 1 gets its fixed share, T-Cont 2-4 get their assured share up to demand,
+    # and the unused assured bandwidth of the group is given as surplus to T-Cont 2, then 3, then 4
+    allocations: dict[str,dict[TCont,float]] = {}
+    unmet: dict[str,dict[TCont,float]] = {}
+    surplus = 0
+    for onu_id in group:
+        onu = simulator.ONUs[onu_id]
+        RT = onu.get_RT()
+        total_proportion = sum(onu.proportions.values())
+        FT: dict[TCont,float] = {}
+        unmet[onu_id] = {}
+        for t in TCont:
+            t = t.value
+            share = onu.max_bw * onu.proportions.get(t,0)/total_proportion if total_proportion > 0 else 0
+            if t == TCont.T1.value:
+                # Fixed bandwidth is granted whether it is used or not
+                FT[t] = share
+                continue
+            FT[t] = min(share, RT[t])
+            surplus += share - FT[t]
+            unmet[onu_id][t] = RT[t] - FT[t]
+        allocations[onu_id] = FT
+    # Distribute the surplus in priority order, proportionally to the unmet demand
+    for t in [2,3,4]:
+        if surplus <= 0:
+            break
+        total_unmet = sum(unmet[onu_id][t] for onu_id in group)
+        if total_unmet <= 0:
+            continue
+        granted = min(surplus, total_unmet)
+        for onu_id in group:
+            allocations[onu_id][t] += granted * unmet[onu_id][t]/total_unmet
+        surplus -= granted
+    return allocations
+
+
+class ComparativeSimulator:
+    # Runs several DBA policies on the same generated traffic, each with its own copy of the ONU state
+    def __init__(self, ONUS: list[ONU], groups: list[list[str]], Tm: float, policies: list[str]):
+        if not policies:
+            raise ValueError("At least one DBA policy is required.")
+        self.simulators: dict[str,DBA_Simulator] = {}
+        for policy in policies:
+            self.simulators[policy] = DBA_Simulator(copy.deepcopy(ONUS), copy.deepcopy(groups), Tm, policy=policy)
+
+    def simulate_cycle(self) -> dict[str,dict[str,dict[TCont,float]]]:
+        # Traffic only depends on the ONU parameters, which every copy shares
+        traffic = next(iter(self.simulators.values())).generate_traffic()
+        allocations: dict[str,dict[str,dict[TCont,float]]] = {}
+        for policy, simulator in self.simulators.items():
+            allocations[policy] = simulator.simulate_cycle(traffic)
+        return allocations
+
+
+def simulate(precision: float | None = None):
+    # Usage example; with a precision the run lasts until it reaches steady state, see steady_state.py
     
     ONUS = [
         ONU("ONU1", 10, 1.244e9, {1:0, 2:0.6, 3:0.2, 4:0.2}),
@@ -215,19 +469,48 @@ def simulate():
     
     simulator = DBA_Simulator(ONUS, groups, Tm)
 
-    print("Simulation for traffic proportions 60% T-Cont 2, 20% T-Cont 3, 20% T-Cont 4\n")
-    for cycle in range(10):
-        allocations = simulator.simulate_cycle()
-        print(f"Cycle {cycle+1} allocations:")
-        for onu_id, allocation in allocations.items():
-            print(f"ONU {onu_id}: FT1: {allocation[1]:.2f}, FT2: {allocation[2]:.2f}, FT3: {allocation[3]:.2f}, FT4: {allocation[4]:.2f}")
-        print("\n")
+    if precision is not None:
+        from steady_state import simulate_until_steady
+        rule = simulate_until_steady(simulator, precision=precision)
+        state = "Steady state reached" if rule.converged else "No steady state"
+        print(f"{state} after {rule.cycles} cycles, the first {rule.warmup} discarded as warm-up\n")
+    else:
+        print("Simulation for traffic proportions 60% T-Cont 2, 20% T-Cont 3, 20% T-Cont 4\n")
+        for cycle in range(10):
+            allocations = simulator.simulate_cycle()
+            print(f"Cycle {cycle+1} allocations:")
+            for onu_id, allocation in allocations.items():
+                print(f"ONU {onu_id}: FT1: {allocation[1]:.2f}, FT2: {allocation[2]:.2f}, FT3: {allocation[3]:.2f}, FT4: {allocation[4]:.2f}")
+            print("\n")
     # After simulation, output latency and max transfer rate
     print("Latency and Max Transfer Rate per ONU:")
     for onu_id, onu in simulator.ONUs.items():
         avg_latency = (onu.total_latency / onu.packets_transmitted) if onu.packets_transmitted > 0 else 0
         print(f"ONU {onu_id}: Average Latency: {avg_latency:.2f}, Max Transfer Rate: {onu.max_allocated_bw:.2f}")
 
-        
+
+def compare(policies: list[str] | None = None, cycles: int = 10):
+    # Usage example: every policy sees the same traffic in a single run
+    ONUS = [
+        ONU("ONU1", 10, 1.244e9, {1:0, 2:0.6, 3:0.2, 4:0.2}),
+        ONU("ONU2", 10, 1.244e9, {1:0, 2:0.8, 3:0.0, 4:0.2}),
+        ONU("ONU3", 10, 1.244e9, {1:0.2, 2:0.4, 3:0.2, 4:0.2}),
+        ONU("ONU4", 10, 1.244e9, {1:0, 2:0.6, 3:0.2, 4:0.2})
+    ]
+
+    groups = [["ONU1", "ONU2"], ["ONU3", "ONU4"]]
+
+    comparison = ComparativeSimulator(ONUS, groups, 0.025, policies or list(DBA_POLICIES))
+    for _ in range(cycles):
+        comparison.simulate_cycle()
+
+    print("Latency and Max Transfer Rate per policy and ONU:")
+    for policy, simulator in comparison.simulators.items():
+        print(f"Policy {policy}:")
+        for onu_id, onu in simulator.ONUs.items():
+            avg_latency = (onu.total_latency / onu.packets_transmitted) if onu.packets_transmitted > 0 else 0
+            print(f"ONU {onu_id}: Average Latency: {avg_latency:.2f}, Max Transfer Rate: {onu.max_allocated_bw:.2f}")
+
+
 if __name__ == "__main__":
     simulate()
\ No newline at end of file
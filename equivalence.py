@@ -0,0 +1,127 @@
+import copy
+import math
+import random
+import time
+from typing import Callable
+from dba import DBA_Simulator, ONU, TCont
+
+# Simulation engines
+# Every engine builds a simulator from (ONUS, groups, Tm, policy, rng); the result only needs
+# simulate_cycle(traffic=None), returning {onu_id: {T-Cont: bandwidth}} like DBA_Simulator, and
+# generate_traffic() when it is compared on shared traffic. An ONU left out of an allocation got nothing.
+ENGINES: dict[str,Callable[[list[ONU],list[list[str]],float,str,random.Random],DBA_Simulator]] = {}
+
+def register_engine(name: str):
+    def decorator(engine):
+        ENGINES[name] = engine
+        return engine
+    return decorator
+
+@register_engine("reference")
+def reference_engine(ONUS: list[ONU], groups: list[list[str]], Tm: float, policy: str, rng: random.Random) -> DBA_Simulator:
+    # Plain scan of every ONU in every cycle, what every other engine is checked against
+    return DBA_Simulator(ONUS, groups, Tm, policy=policy, rng=rng, track_active=False)
+
+@register_engine("active_set")
+def active_set_engine(ONUS: list[ONU], groups: list[list[str]], Tm: float, policy: str, rng: random.Random) -> DBA_Simulator:
+    return DBA_Simulator(ONUS, groups, Tm, policy=policy, rng=rng, track_active=True)
+
+
+class Divergence:
+    def __init__(self, cycle: int, onu_id: str, tcont: int, reference: float, candidate: float):
+        self.cycle = cycle  # 1-based, as in the simulation output
+        self.onu_id = onu_id
+        self.tcont = tcont
+        self.reference = reference
+        self.candidate = candidate
+
+    def __str__(self):
+        return f"cycle {self.cycle}, ONU {self.onu_id}, T-Cont {self.tcont}: reference {self.reference!r}, candidate {self.candidate!r}"
+
+class EquivalenceReport:
+    def __init__(self, engine: str, cycles: int, divergence: Divergence | None, reference_time: float, candidate_time: float, arrived: float):
+        self.engine = engine
+        self.cycles = cycles  # Cycles compared, up to and including the divergent one
+        self.divergence = divergence
+        self.reference_time = reference_time  # Seconds spent in simulate_cycle
+        self.candidate_time = candidate_time
+        self.arrived = arrived  # Data the reference enqueued, 0 means nothing was exercised
+
+    @property
+    def equivalent(self) -> bool:
+        return self.divergence is None
+
+def first_divergence(reference: dict[str,dict[TCont,float]], candidate: dict[str,dict[TCont,float]], cycle: int, rel_tol: float, abs_tol: float) -> Divergence | None:
+    # ONUs are checked in reference order, then the ones only the candidate allocated to
+    no_allocation: dict[TCont,float] = {}
+    for onu_id in list(reference) + [onu_id for onu_id in candidate if onu_id not in reference]:
+        expected = reference.get(onu_id, no_allocation)
+        actual = candidate.get(onu_id, no_allocation)
+        for t in TCont:
+            t = t.value
+            if not math.isclose(expected.get(t, 0), actual.get(t, 0), rel_tol=rel_tol, abs_tol=abs_tol):
+                return Divergence(cycle, onu_id, t, expected.get(t, 0), actual.get(t, 0))
+    return None
+
+def check_equivalence(engine: str, ONUS: list[ONU], groups: list[list[str]], Tm: float, policy: str = "bexcess", seed: int = 0, load: float = 1.0, cycles: int = 200, rel_tol: float = 1e-9, abs_tol: float = 1e-9, shared_traffic: bool = False) -> EquivalenceReport:
+    """
+    Runs the reference engine and another one side by side and compares every cycle.
+
+    Both engines start from their own copy of the ONUs and a random.Random seeded alike, so each
+    generates the same traffic unless its traffic generator differs. With shared_traffic the
+    reference generates the traffic of every cycle and both engines enqueue it, which isolates
+    the DBA and the transmission loop from the generator.
+
+    Args:
+        engine (str): Name of the engine checked, see ENGINES.
+        ONUS (list[ONU]): ONUs of the topology, not modified.
+        groups (list[list[str]]): ONU ids per group.
+        Tm (float): Margin time.
+        policy (str): DBA policy both engines run.
+        seed (int): Seed of the traffic.
+        load (float): Traffic load multiplier, see DBA_Simulator.load.
+        cycles (int): Number of cycles compared.
+        rel_tol (float): Relative tolerance on every allocation, as in math.isclose.
+        abs_tol (float): Absolute tolerance on every allocation.
+        shared_traffic (bool): Feed the reference's traffic to the candidate.
+
+    Returns:
+        EquivalenceReport: The first divergent cycle, ONU and T-Cont, if any, the time each
+        engine spent simulating and the data the reference enqueued.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine '{engine}'. Available: {', '.join(ENGINES)}")
+    reference = ENGINES["reference"](copy.deepcopy(ONUS), copy.deepcopy(groups), Tm, policy, random.Random(seed))
+    candidate = ENGINES[engine](copy.deepcopy(ONUS), copy.deepcopy(groups), Tm, policy, random.Random(seed))
+    reference.load = candidate.load = load
+    reference_time = candidate_time = 0.0
+
+    for cycle in range(1, cycles + 1):
+        traffic = reference.generate_traffic() if shared_traffic else None
+        start = time.perf_counter()
+        expected = reference.simulate_cycle(traffic)
+        reference_time += time.perf_counter() - start
+        start = time.perf_counter()
+        actual = candidate.simulate_cycle(traffic)
+        candidate_time += time.perf_counter() - start
+
+        divergence = first_divergence(expected, actual, cycle, rel_tol, abs_tol)
+        if divergence:
+            break
+    else:
+        cycle, divergence = cycles, None
+    arrived = sum(sum(onu.arrived.values()) for onu in reference.ONUs.values())
+    return EquivalenceReport(engine, cycle, divergence, reference_time, candidate_time, arrived)
+
+
+if __name__ == "__main__":
+    # Usage example
+    ONUS = [
+        ONU("ONU1", 10, 1000, {1:0, 2:0.6, 3:0.2, 4:0.2}),
+        ONU("ONU2", 10, 1000, {1:0, 2:0.8, 3:0.0, 4:0.2}),
+        ONU("ONU3", 10, 2000, {1:0.2, 2:0.4, 3:0.2, 4:0.2}),
+        ONU("ONU4", 10, 2000, {1:0, 2:0.6, 3:0.2, 4:0.2})
+    ]
+
+    report = check_equivalence("active_set", ONUS, [["ONU1", "ONU2"], ["ONU3", "ONU4"]], 0.025, cycles=100)
+    print(f"Engine {report.engine}: {'equivalent' if report.equivalent else f'diverges at {report.divergence}'} over {report.cycles} cycles")
@@ -0,0 +1,115 @@
+import numpy as np
+
+TCONTS = 4
+
+class AllocationHistory:
+    """
+    Columnar store of the allocations of a simulation run.
+
+    Allocations are kept in a preallocated cycle x ONU x T-Cont float array that doubles its
+    capacity when full, next to the derived FTtotal and BWexcess columns (cycle x ONU).
+    ONU ids are interned to column indices once, at construction.
+    """
+
+    def __init__(self, onu_ids: list[str], max_bws: list[float], capacity: int = 1024):
+        self.onu_ids: list[str] = list(onu_ids)
+        self.onu_index: dict[str, int] = {onu_id: i for i, onu_id in enumerate(self.onu_ids)}
+        self.max_bw = np.asarray(max_bws, dtype=np.float64)
+        self.size: int = 0
+
+        capacity = max(capacity, 1)
+        self._allocations = np.zeros((capacity, len(self.onu_ids), TCONTS))
+        self._ft_total = np.zeros((capacity, len(self.onu_ids)))
+        self._bw_excess = np.zeros((capacity, len(self.onu_ids)))
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for cycle in range(self.size):
+            yield self.cycle(cycle)
+
+    @property
+    def allocations(self) -> np.ndarray:
+        # cycle x ONU x T-Cont view of the recorded cycles
+        return self._allocations[:self.size]
+
+    @property
+    def ft_total(self) -> np.ndarray:
+        return self._ft_total[:self.size]
+
+    @property
+    def bw_excess(self) -> np.ndarray:
+        return self._bw_excess[:self.size]
+
+    def _grow(self):
+        capacity = self._allocations.shape[0] * 2
+        self._allocations = self._grown(self._allocations, capacity)
+        self._ft_total = self._grown(self._ft_total, capacity)
+        self._bw_excess = self._grown(self._bw_excess, capacity)
+
+    def _grown(self, column: np.ndarray, capacity: int) -> np.ndarray:
+        grown = np.zeros((capacity,) + column.shape[1:])
+        grown[:self.size] = column[:self.size]
+        return grown
+
+    def append(self, allocations: dict[str, dict[int, float]]):
+        row = np.zeros((len(self.onu_ids), TCONTS))
+        for onu_id, alloc in allocations.items():
+            row[self.onu_index[onu_id]] = (alloc.get(1, 0), alloc.get(2, 0), alloc.get(3, 0), alloc.get(4, 0))
+        self.append_array(row)
+
+    def append_array(self, row: np.ndarray):
+        # row is an ONU x T-Cont array in the interned ONU order
+        if self.size == self._allocations.shape[0]:
+            self._grow()
+        self._allocations[self.size] = row
+        ft_total = self._allocations[self.size].sum(axis=1)
+        self._ft_total[self.size] = ft_total
+        self._bw_excess[self.size] = np.maximum(self.max_bw - ft_total, 0)
+        self.size += 1
+
+    def set_max_bw(self, onu_id: str, max_bw: float):
+        # Only cycles appended from now on use the new value for BWexcess
+        self.max_bw[self.onu_index[onu_id]] = max_bw
+
+    def cycle(self, cycle: int) -> dict[str, dict[int, float]]:
+        # Rebuilds the {onu_id: {T-Cont: bandwidth}} layout the simulator returns
+        row = self._allocations[cycle].tolist()
+        return {onu_id: {t + 1: values[t] for t in range(TCONTS)} for onu_id, values in zip(self.onu_ids, row)}
+
+    def _window(self, column: np.ndarray, start: int, stop: int | None) -> np.ndarray:
+        return column[start:self.size if stop is None else min(stop, self.size)]
+
+    def mean_allocation(self, tcont: int | None = None, start: int = 0, stop: int | None = None) -> np.ndarray:
+        """
+        Mean allocation per ONU over a window of cycles.
+
+        Args:
+            tcont (int | None): T-Cont to aggregate (1 to 4), or None for FTtotal.
+            start (int): First cycle of the window.
+            stop (int | None): Cycle after the last one of the window, None for the end of the run.
+
+        Returns:
+            np.ndarray: One value per ONU, in onu_ids order.
+        """
+        column = self._ft_total if tcont is None else self._allocations[:, :, tcont - 1]
+        window = self._window(column, start, stop)
+        return window.mean(axis=0) if len(window) else np.zeros(len(self.onu_ids))
+
+    def max_allocation(self, tcont: int | None = None, start: int = 0, stop: int | None = None) -> np.ndarray:
+        column = self._ft_total if tcont is None else self._allocations[:, :, tcont - 1]
+        window = self._window(column, start, stop)
+        return window.max(axis=0) if len(window) else np.zeros(len(self.onu_ids))
+
+    def utilization(self, start: int = 0, stop: int | None = None) -> np.ndarray:
+        # Fraction of each ONU's maximum bandwidth that was allocated over the window
+        window = self._window(self._ft_total, start, stop)
+        if not len(window):
+            return np.zeros(len(self.onu_ids))
+        capacity = self.max_bw * len(window)
+        return np.divide(window.sum(axis=0), capacity, out=np.zeros(len(self.onu_ids)), where=capacity > 0)
+
+    def bexcess_over_time(self, start: int = 0, stop: int | None = None) -> np.ndarray:
+        # Total unallocated bandwidth of all ONUs, one value per cycle
+        return self._window(self._bw_excess, start, stop).sum(axis=1)
@@ -19,6 +19,8 @@ document.addEventListener("DOMContentLoaded", function(event) {
 			});
 		});
 
+		// Let the backend push the components restored from the autosave
+		backend.mapReady();
     });
 });
 
@@ -1,61 +1,85 @@
 import csv
-from network_nodes import Node, Connection, OLTNode, ONUNode, SplitterNode
+from network_nodes import Node, Connection, OLTNode, ONUNode, SplitterNode, Topology
 from typing import List, Tuple
 
+FIELDNAMES = ['ID', 'Type', 'Latitude', 'Longitude', 'Start Node', 'End Node', 'Length', 'Bandwidth', 'T-Cont1', 'T-Cont2', 'T-Cont3', 'T-Cont4']
+
+def component_to_row(component: Node|Connection) -> dict[str, object]:
+    if isinstance(component, Connection):
+        return {
+            'ID': component.id,
+            'Type': 'Connection',
+            'Start Node': component.start_node.id,
+            'End Node': component.end_node.id,
+            'Length': component.length
+        }
+    row = {
+        'ID': component.id,
+        'Type': component.__class__.__name__,
+        'Latitude': component.lat,
+        'Longitude': component.lon
+    }
+    if isinstance(component, ONUNode):
+        row['Bandwidth'] = component.bandwidth
+        row['T-Cont1'] = component.traffic_proportions[1]
+        row['T-Cont2'] = component.traffic_proportions[2]
+        row['T-Cont3'] = component.traffic_proportions[3]
+        row['T-Cont4'] = component.traffic_proportions[4]
+    return row
+
+def component_from_row(row: dict[str, str], topology: Topology) -> Node|Connection:
+    # Connections look their endpoints up in the topology, so nodes must be read first
+    if row['Type'] in ['OLTNode', 'SplitterNode']:
+        return globals()[row['Type']](lat=float(row['Latitude']), lon=float(row['Longitude']), id=row['ID'], topology=topology)
+    elif row['Type'] == 'ONUNode':
+        traffic_proportions = {1: float(row['T-Cont1']), 2: float(row['T-Cont2']), 3: float(row['T-Cont3']), 4: float(row['T-Cont4'])}
+        return ONUNode(lat=float(row['Latitude']), lon=float(row['Longitude']), id=row['ID'], bandwidth=int(row['Bandwidth']), traffic_proportions=traffic_proportions, topology=topology)
+    elif row['Type'] == 'Connection':
+        # Networks saved before lengths were stored fall back to the geodesic distance
+        length = float(row['Length']) if row.get('Length') else None
+        return Connection(start_node=topology[row['Start Node']], end_node=topology[row['End Node']], id=row['ID'], length=length)
+    raise ValueError(f"Unknown component type '{row['Type']}'")
+
+def remove_component(components: Topology, component_id: str):
+    # Removing a node also removes every connection attached to it
+    component = components[component_id]
+    if isinstance(component, Node):
+        for connection in component.connections:
+            connection.remove()
+    component.remove()
+
 def dump_network_to_csv(components, file_path: str):
     nodes = [comp for comp in components if isinstance(comp, Node)]
     connections = [comp for comp in components if isinstance(comp, Connection)]
     
     with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-        fieldnames = ['ID', 'Type', 'Latitude', 'Longitude', 'Start Node', 'End Node', 'Bandwidth', 'T-Cont1', 'T-Cont2', 'T-Cont3', 'T-Cont4']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames, delimiter=';')
+        writer = csv.DictWriter(csvfile, fieldnames=FIELDNAMES, delimiter=';')
         writer.writeheader()
 
         for node in nodes:
-            row = {
-                'ID': node.id,
-                'Type': node.__class__.__name__,
-                'Latitude': node.lat,
-                'Longitude': node.lon
-            }
-            if isinstance(node, ONUNode):
-                row['Bandwidth'] = node.bandwidth
-                row['T-Cont1'] = node.traffic_proportions[1]
-                row['T-Cont2'] = node.traffic_proportions[2]
-                row['T-Cont3'] = node.traffic_proportions[3]
-                row['T-Cont4'] = node.traffic_proportions[4]
-            writer.writerow(row)
+            writer.writerow(component_to_row(node))
 
         for connection in connections:
-            writer.writerow({
-                'ID': connection.id,
-                'Type': 'Connection',
-                'Start Node': connection.start_node.id,
-                'End Node': connection.end_node.id
-            })
-
-def load_network_from_csv(file_path: str) -> dict[str, Node|Connection]:
+            writer.writerow(component_to_row(connection))
+
+def load_network_from_csv(file_path: str, topology: Topology | None = None) -> Topology:
     """
     Loads the network from a CSV file.
 
     Args:
         file_path (str): The path to the CSV file to read.
+        topology (Topology | None): Graph store the components are created in, a new one when None.
 
     Returns:
-        Tuple[List[Node], List<Connection]]: A tuple containing the list of nodes and connections.
+        Topology: The loaded network, which maps every component id to its component.
     """
-    nodes = {}
+    topology = topology if topology is not None else Topology()
     
     with open(file_path, 'r', newline='', encoding='utf-8') as csvfile:
         reader = csv.DictReader(csvfile, delimiter=';')
         for row in reader:
-            if row['Type'] in ['OLTNode', 'SplitterNode']:
-                nodes[row['ID']] = globals()[row['Type']](lat=float(row['Latitude']), lon=float(row['Longitude']), id=row['ID'])
-            elif row['Type'] == 'ONUNode':
-                traffic_proportions = {1: float(row['T-Cont1']), 2: float(row['T-Cont2']), 3: float(row['T-Cont3']), 4: float(row['T-Cont4'])}
-                nodes[row['ID']] = ONUNode(lat=float(row['Latitude']), lon=float(row['Longitude']), id=row['ID'], bandwidth=int(row['Bandwidth']), traffic_proportions=traffic_proportions)
-            elif row['Type'] == 'Connection':
-                nodes[row['ID']] = Connection(start_node=nodes[row['Start Node']], end_node=nodes[row['End Node']], id=row['ID'])
-
-    return nodes
+            if row['Type'] in ['OLTNode', 'SplitterNode', 'ONUNode', 'Connection']:
+                component_from_row(row, topology)
+
+    return topology
 
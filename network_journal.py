@@ -0,0 +1,145 @@
+import csv
+import io
+import os
+from network_nodes import Node, Connection, ONUNode, Topology
+from network_dump import FIELDNAMES, component_to_row, component_from_row, remove_component, dump_network_to_csv, load_network_from_csv
+
+JOURNAL_FIELDNAMES = ['Op'] + FIELDNAMES
+
+class NetworkJournal:
+    """
+    Append-only autosave of network edits.
+
+    Every add/update/remove is appended to the journal and flushed to disk as it happens. Once the
+    journal holds compact_every entries the whole network is written to the snapshot and the
+    journal starts over, so recovery is the snapshot plus the journal replayed on top of it.
+    """
+
+    def __init__(self, snapshot_path: str, journal_path: str | None = None, compact_every: int = 500):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path if journal_path else os.path.splitext(snapshot_path)[0] + '.journal'
+        self.compact_every = compact_every
+        self.components: Topology = Topology()
+        self.entries: int = 0
+        self.file = None
+        self.writer = None
+
+    def recover(self, topology: Topology | None = None) -> Topology:
+        """
+        Rebuilds the network from the snapshot and the journal and starts journaling on top of it.
+
+        A crash mid-write can only tear the last record. It is recognised by its shape (the journal
+        does not end with a line break, or the record has the wrong number of fields) and dropped,
+        even when what is left of it still parses. A record that can not be replayed anywhere else
+        means the journal itself is damaged: every readable record is still replayed, but the
+        journal is kept aside as <journal>.corrupt before it is compacted away.
+
+        Args:
+            topology (Topology | None): Graph store the components are created in, a new one when None.
+
+        Returns:
+            Topology: The recovered network, empty when nothing was saved.
+        """
+        components = topology if topology is not None else Topology()
+        if os.path.exists(self.snapshot_path):
+            load_network_from_csv(self.snapshot_path, components)
+        entries = 0
+        torn = False
+        outdated = False
+        failed: list[int] = []
+
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'r', newline='', encoding='utf-8') as journal_file:
+                text = journal_file.read()
+            reader = csv.DictReader(io.StringIO(text, newline=''), delimiter=';')
+            rows = list(reader)
+            if rows and (not text.endswith('\n') or len(rows[-1]) != len(reader.fieldnames) or None in rows[-1].values()):
+                torn = True
+                rows.pop()
+            # A journal written with other columns is replayed by name, but not appended to
+            outdated = reader.fieldnames != JOURNAL_FIELDNAMES
+            for i, row in enumerate(rows):
+                try:
+                    self._replay(row, components)
+                except (KeyError, ValueError, TypeError):
+                    failed.append(i)
+                    continue
+                entries += 1
+            if failed:
+                corrupt_path = self.journal_path + '.corrupt'
+                os.replace(self.journal_path, corrupt_path)
+                print(f"Journal records {', '.join(str(i + 1) for i in failed)} could not be replayed, the journal was kept as {corrupt_path}")
+
+        self.components = components
+        if torn or outdated or failed:
+            # Start from a clean journal, appending would glue the next record onto the torn one
+            # or write it under the wrong header
+            self.compact(components)
+        else:
+            self._open(truncate=False)
+            self.entries = entries
+        return components
+
+    def _replay(self, row: dict[str, str], components: Topology):
+        # Replays are idempotent, a journal may be replayed on top of the snapshot it was compacted into
+        if row['Op'] == 'add':
+            if row['ID'] not in components:
+                component_from_row(row, components)
+        elif row['Op'] == 'update':
+            component = components.get(row['ID'])
+            if isinstance(component, ONUNode):
+                updated = component_from_row(row, Topology())
+                component.bandwidth = updated.bandwidth
+                component.traffic_proportions = updated.traffic_proportions
+        elif row['Op'] == 'remove':
+            if row['ID'] in components:
+                remove_component(components, row['ID'])
+        else:
+            raise ValueError(f"Unknown journal operation '{row['Op']}'")
+
+    def _open(self, truncate: bool):
+        if self.file:
+            self.file.close()
+        new_file = truncate or not os.path.exists(self.journal_path) or os.path.getsize(self.journal_path) == 0
+        self.file = open(self.journal_path, 'w' if truncate else 'a', newline='', encoding='utf-8')
+        self.writer = csv.DictWriter(self.file, fieldnames=JOURNAL_FIELDNAMES, delimiter=';')
+        if new_file:
+            self.writer.writeheader()
+            self._sync()
+
+    def _sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def _append(self, row: dict[str, object]):
+        if self.file is None:
+            self._open(truncate=False)
+        self.writer.writerow(row)
+        self._sync()
+        self.entries += 1
+        if self.entries >= self.compact_every:
+            self.compact(self.components)
+
+    def record_add(self, component: Node|Connection):
+        self._append({'Op': 'add', **component_to_row(component)})
+
+    def record_update(self, component: ONUNode):
+        # ONU parameters edited in place, replayed over the existing component
+        self._append({'Op': 'update', **component_to_row(component)})
+
+    def record_remove(self, component_id: str):
+        self._append({'Op': 'remove', 'ID': component_id})
+
+    def compact(self, components: Topology):
+        # The snapshot is replaced atomically before the journal is cleared
+        self.components = components
+        temp_path = self.snapshot_path + '.tmp'
+        dump_network_to_csv(list(components.values()), temp_path)
+        os.replace(temp_path, self.snapshot_path)
+        self._open(truncate=True)
+        self.entries = 0
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
@@ -1,19 +1,240 @@
 # network_nodes.py
 
 import uuid
-from typing import Optional, Dict, List, Tuple
+from array import array
+from collections.abc import Mapping
+from typing import Optional, Dict, List, Iterator
+
+# Propagation delay in single-mode fiber (group index ~1.47), in seconds per km
+FIBER_DELAY_PER_KM = 4.9e-6
+
+def fiber_length_km(node1: 'Node', node2: 'Node') -> float:
+    # Only computed for connections drawn on the map, saved networks store the length; geopy is only imported on first use
+    from geopy.distance import geodesic
+    return geodesic((node1.lat, node1.lon), (node2.lat, node2.lon)).km
+
+class Topology(Mapping):
+    """
+    Compact store of a network graph, and the mapping of its component ids to components.
+
+    Nodes and connections are registered under integer handles (one handle space each). Their
+    string ids and every attribute (coordinates, node type, ONU bandwidth, traffic proportions and
+    path to the OLT, connection length and selection) live in flat arrays indexed by handle.
+    Adjacency is kept as doubly linked lists of half-edges: connection e owns half-edges 2e (start
+    side) and 2e+1 (end side), so linking or unlinking a connection is O(1) and costs no Python
+    object per edge. Node and Connection objects are views over it, built on demand when a
+    component is looked up, so no object per component is kept alive.
+
+    Removing a component frees its id, its index entry and its OLT path; a removed handle is not
+    reused, its array slots stay as a few dead bytes.
+    """
+    __slots__ = ('node_ids', 'node_classes', 'kinds', 'lat', 'lon', 'bandwidth', 'proportions',
+                 'fiber_length', 'rtt', 'olt_paths', 'head', 'tail', 'degrees',
+                 'edge_ids', 'edge_nodes', 'next', 'prev', 'length', 'selected', 'index', 'size')
+
+    # Topologies are compared by identity, not as mappings
+    __eq__ = object.__eq__
+    __hash__ = object.__hash__
+
+    def __init__(self):
+        self.node_ids: List[Optional[str]] = []  # node handle -> string id, None once removed
+        self.node_classes: List[type] = []
+        self.kinds = bytearray()  # node handle -> index in node_classes
+        self.lat = array('d')
+        self.lon = array('d')
+        self.bandwidth = array('q')  # ONU payload, 0 for other nodes
+        self.proportions = array('d')  # 4 traffic proportions per node, T-Cont 1 to 4
+        self.fiber_length = array('d')
+        self.rtt = array('d')
+        self.olt_paths: Dict[int, array] = {}  # ONU handle -> connection handles to the OLT
+        self.head = array('q')  # node handle -> first half-edge, -1 when isolated
+        self.tail = array('q')  # node handle -> last half-edge
+        self.degrees = array('q')
+        self.edge_ids: List[Optional[str]] = []  # connection handle -> string id, None once removed
+        self.edge_nodes = array('q')  # half-edge -> node handle
+        self.next = array('q')  # half-edge -> next half-edge of the same node, -1 at the end, -2 when unlinked
+        self.prev = array('q')
+        self.length = array('d')  # connection handle -> fiber length in km
+        self.selected = bytearray()
+        self.index: Dict[str, int] = {}  # id -> node handle, or ~handle for a connection
+        self.size: int = 0  # live nodes and connections
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self) -> Iterator[str]:
+        # Nodes first, then connections, each in creation order
+        for id in self.node_ids:
+            if id is not None:
+                yield id
+        for id in self.edge_ids:
+            if id is not None:
+                yield id
+
+    def __contains__(self, id) -> bool:
+        return id in self.index
+
+    def __getitem__(self, id: str) -> 'Node | Connection':
+        handle = self.index[id]
+        return self.node(handle) if handle >= 0 else self.connection(~handle)
+
+    def node(self, handle: int) -> 'Node':
+        view = self.node_classes[self.kinds[handle]].__new__(self.node_classes[self.kinds[handle]])
+        view.topology = self
+        view.handle = handle
+        return view
+
+    def connection(self, handle: int) -> 'Connection':
+        view = Connection.__new__(Connection)
+        view.topology = self
+        view.handle = handle
+        return view
+
+    def _register(self, id: Optional[str], handle: int) -> str:
+        id = id if id else str(uuid.uuid4())
+        if id in self.index:
+            raise ValueError(f"Component id '{id}' already exists.")
+        self.index[id] = handle
+        return id
+
+    def add_node(self, node_class: type, lat: float, lon: float, id: Optional[str] = None) -> int:
+        handle = len(self.node_ids)
+        self.node_ids.append(self._register(id, handle))
+        if node_class not in self.node_classes:
+            self.node_classes.append(node_class)
+        self.kinds.append(self.node_classes.index(node_class))
+        self.lat.append(lat)
+        self.lon.append(lon)
+        self.bandwidth.append(0)
+        self.proportions.extend((0, 0, 0, 0))
+        self.fiber_length.append(0)
+        self.rtt.append(0)
+        self.head.append(-1)
+        self.tail.append(-1)
+        self.degrees.append(0)
+        self.size += 1
+        return handle
+
+    def add_connection(self, start_handle: int, end_handle: int, length: float, id: Optional[str] = None) -> int:
+        handle = len(self.edge_ids)
+        self.edge_ids.append(self._register(id, ~handle))
+        self.length.append(length)
+        self.selected.append(0)
+        for node_handle in (start_handle, end_handle):
+            self.edge_nodes.append(node_handle)
+            self.next.append(-2)
+            self.prev.append(-2)
+        self._link(2 * handle)
+        self._link(2 * handle + 1)
+        self.size += 1
+        return handle
+
+    def _link(self, half_edge: int):
+        # Appends at the tail so connections keep their creation order
+        node_handle = self.edge_nodes[half_edge]
+        last = self.tail[node_handle]
+        self.prev[half_edge] = last
+        self.next[half_edge] = -1
+        if last == -1:
+            self.head[node_handle] = half_edge
+        else:
+            self.next[last] = half_edge
+        self.tail[node_handle] = half_edge
+        self.degrees[node_handle] += 1
+
+    def _unlink(self, half_edge: int):
+        following, previous = self.next[half_edge], self.prev[half_edge]
+        if following == -2:
+            return
+        node_handle = self.edge_nodes[half_edge]
+        if previous == -1:
+            self.head[node_handle] = following
+        else:
+            self.next[previous] = following
+        if following == -1:
+            self.tail[node_handle] = previous
+        else:
+            self.prev[following] = previous
+        self.next[half_edge] = self.prev[half_edge] = -2
+        self.degrees[node_handle] -= 1
+
+    def unlink(self, node_handle: int, connection_handle: int):
+        for half_edge in (2 * connection_handle, 2 * connection_handle + 1):
+            if self.edge_nodes[half_edge] == node_handle:
+                self._unlink(half_edge)
+
+    def remove_connection(self, connection_handle: int):
+        self._unlink(2 * connection_handle)
+        self._unlink(2 * connection_handle + 1)
+        id = self.edge_ids[connection_handle]
+        if id is not None:
+            del self.index[id]
+            self.edge_ids[connection_handle] = None
+            self.size -= 1
+
+    def remove_node(self, node_handle: int):
+        if self.degrees[node_handle]:
+            raise ValueError("Remove the connections of a node before removing the node.")
+        id = self.node_ids[node_handle]
+        if id is not None:
+            del self.index[id]
+            self.node_ids[node_handle] = None
+            self.olt_paths.pop(node_handle, None)
+            self.size -= 1
+
+    def connections_of(self, node_handle: int) -> List['Connection']:
+        connections = []
+        half_edge = self.head[node_handle]
+        while half_edge != -1:
+            connections.append(self.connection(half_edge >> 1))
+            half_edge = self.next[half_edge]
+        return connections
 
 class Point:
+    __slots__ = ('lat', 'lon')
+
     def __init__(self, lat: float, lon: float):
         self.lat = lat
         self.lon = lon
 
-class Node(Point):
-    def __init__(self, lat: float, lon: float, id: Optional[str] = None):
-        super().__init__(lat, lon)
-        self.id = id if id else str(uuid.uuid4())
-        self.connections: List[Connection] = []
-        self.icon_url = ""
+class _View:
+    # A component is its topology and handle; views of the same component compare equal
+    __slots__ = ('topology', 'handle')
+
+    def __eq__(self, other):
+        return type(other) is type(self) and other.topology is self.topology and other.handle == self.handle
+
+    def __hash__(self):
+        return hash((id(self.topology), self.handle))
+
+class Node(_View):
+    __slots__ = ()
+    icon_url = ""
+
+    def __init__(self, lat: float, lon: float, id: Optional[str] = None, topology: Optional[Topology] = None):
+        # A node created without a topology starts a network of its own
+        self.topology: Topology = topology if topology is not None else Topology()
+        self.handle: int = self.topology.add_node(type(self), lat, lon, id)
+
+    @property
+    def id(self) -> Optional[str]:
+        return self.topology.node_ids[self.handle]
+
+    @property
+    def lat(self) -> float:
+        return self.topology.lat[self.handle]
+
+    @property
+    def lon(self) -> float:
+        return self.topology.lon[self.handle]
+
+    @property
+    def connections(self) -> List['Connection']:
+        return self.topology.connections_of(self.handle)
+
+    @property
+    def degree(self) -> int:
+        return self.topology.degrees[self.handle]
 
     def connect(self, node: 'Node') -> 'Connection':
         return self._connect(node)
@@ -23,27 +244,52 @@ class Node(Point):
         return connection
 
     def remove_connection(self, connection: 'Connection'):
-        if connection in self.connections:
-            self.connections.remove(connection)
-
-class Connection:
-    def __init__(self, start_node: Node, end_node: Node, id: Optional[str] = None):
-        self.id = id if id else str(uuid.uuid4())
-        self.start_node = start_node
-        self.end_node = end_node
-        self.selected = False
-        
-        self.start_node.connections.append(self)
-        self.end_node.connections.append(self)
+        self.topology.unlink(self.handle, connection.handle)
+
+    def remove(self):
+        self.topology.remove_node(self.handle)
+
+class Connection(_View):
+    __slots__ = ()
+
+    def __init__(self, start_node: Node, end_node: Node, id: Optional[str] = None, length: Optional[float] = None):
+        if start_node.topology is not end_node.topology:
+            raise ValueError("Nodes from different networks cannot be connected.")
+        if length is None:
+            length = fiber_length_km(start_node, end_node)
+        self.topology: Topology = start_node.topology
+        self.handle: int = self.topology.add_connection(start_node.handle, end_node.handle, length, id)
+
+    @property
+    def id(self) -> Optional[str]:
+        return self.topology.edge_ids[self.handle]
+
+    @property
+    def length(self) -> float:
+        return self.topology.length[self.handle]
+
+    @property
+    def selected(self) -> bool:
+        return bool(self.topology.selected[self.handle])
+
+    @selected.setter
+    def selected(self, selected: bool):
+        self.topology.selected[self.handle] = bool(selected)
+
+    @property
+    def start_node(self) -> Node:
+        return self.topology.node(self.topology.edge_nodes[2 * self.handle])
+
+    @property
+    def end_node(self) -> Node:
+        return self.topology.node(self.topology.edge_nodes[2 * self.handle + 1])
 
     def remove(self):
-        self.start_node.remove_connection(self)
-        self.end_node.remove_connection(self)
+        self.topology.remove_connection(self.handle)
 
 class OLTNode(Node):
-    def __init__(self, lat: float, lon: float, id: Optional[str] = None):
-        super().__init__(lat, lon, id)
-        self.icon_url = "https://symbols.getvecta.com/stencil_37/6_mainframe.fb99fbaf71.svg"
+    __slots__ = ()
+    icon_url = "https://symbols.getvecta.com/stencil_37/6_mainframe.fb99fbaf71.svg"
 
     def connect(self, node: 'Node') -> 'Connection':
         if isinstance(node, OLTNode):
@@ -51,48 +297,91 @@ class OLTNode(Node):
         return self._connect(node)
 
 class ONUNode(Node):
-    def __init__(self, lat: float, lon: float, id: Optional[str] = None, bandwidth: int = 0, traffic_proportions: Dict[int, float] = None):
-        super().__init__(lat, lon, id)
-        self.icon_url = "https://symbols.getvecta.com/stencil_37/7_router.dde201f0d4.svg"
+    __slots__ = ()
+    icon_url = "https://symbols.getvecta.com/stencil_37/7_router.dde201f0d4.svg"
+
+    def __init__(self, lat: float, lon: float, id: Optional[str] = None, bandwidth: int = 0, traffic_proportions: Dict[int, float] = None, topology: Optional[Topology] = None):
+        super().__init__(lat, lon, id, topology)
         self.bandwidth = bandwidth
-        self.olt_connection_ids: List[str] = []
-        
+
         if traffic_proportions:
             self.traffic_proportions = traffic_proportions
         else:
             self.traffic_proportions = {1:0 ,2: 0.6, 3: 0.2, 4: 0.2}
 
+    @property
+    def bandwidth(self) -> int:
+        return self.topology.bandwidth[self.handle]
+
+    @bandwidth.setter
+    def bandwidth(self, bandwidth: int):
+        self.topology.bandwidth[self.handle] = bandwidth
+
+    @property
+    def traffic_proportions(self) -> Dict[int, float]:
+        # A copy, assign a whole dict to change it
+        start = 4 * self.handle
+        return dict(zip((1, 2, 3, 4), self.topology.proportions[start:start + 4]))
+
+    @traffic_proportions.setter
+    def traffic_proportions(self, traffic_proportions: Dict[int, float]):
+        start = 4 * self.handle
+        self.topology.proportions[start:start + 4] = array('d', (traffic_proportions.get(t, 0) for t in (1, 2, 3, 4)))
+
+    @property
+    def olt_connection_ids(self) -> List[str]:
+        # From the OLT side down to the ONU, as of the last get_olt_connection_ids; removed connections are left out
+        edge_ids = self.topology.edge_ids
+        return [edge_ids[handle] for handle in self.topology.olt_paths.get(self.handle, ()) if edge_ids[handle] is not None]
+
+    @property
+    def fiber_length(self) -> float:
+        return self.topology.fiber_length[self.handle]
+
+    @property
+    def rtt(self) -> float:
+        return self.topology.rtt[self.handle]
+
     def connect(self, node: 'Node') -> 'Connection':
         if isinstance(node, ONUNode):
             raise ValueError("ONU nodes cannot connect with other ONU nodes.")
         return self._connect(node)
 
-    
-    def get_olt_connection_ids(self, node=None, visited=None):
-        if visited is None and node is None:
-            self.olt_connection_ids = []
-            visited = set()
-            node = self
-       
-        if node.id in visited:
+    def get_olt_connection_ids(self) -> bool:
+        # Finds the path to an OLT and stores it with its fiber length and round-trip time
+        path: List[int] = []
+        found = self._find_olt(self, set(), path)
+        topology = self.topology
+        if path:
+            topology.olt_paths[self.handle] = array('q', path)
+        else:
+            topology.olt_paths.pop(self.handle, None)
+        fiber_length = 0
+        for handle in path:
+            fiber_length += topology.length[handle]
+        topology.fiber_length[self.handle] = fiber_length
+        topology.rtt[self.handle] = 2 * fiber_length * FIBER_DELAY_PER_KM
+        return found
+
+    def _find_olt(self, node: Node, visited: set, path: List[int]) -> bool:
+        if node.handle in visited:
             return False
-        
-        visited.add(node.id)
+
+        visited.add(node.handle)
         for connection in node.connections:
             if isinstance(connection.end_node, OLTNode) or isinstance(connection.start_node, OLTNode):
-                self.olt_connection_ids.append(connection.id)
+                path.append(connection.handle)
                 return True
-            
+
             next_node = connection.end_node if connection.start_node == node else connection.start_node
-            if len(next_node.connections) == 1:
+            if next_node.degree == 1:
                 continue
-            
-            if self.get_olt_connection_ids(next_node, visited):
-                self.olt_connection_ids.append(connection.id)
+
+            if self._find_olt(next_node, visited, path):
+                path.append(connection.handle)
                 return True
         return False
 
 class SplitterNode(Node):
-    def __init__(self, lat: float, lon: float, id: Optional[str] = None):
-        super().__init__(lat, lon, id)
-        self.icon_url = "https://symbols.getvecta.com/stencil_37/9_switch.a8945b4320.svg"
\ No newline at end of file
+    __slots__ = ()
+    icon_url = "https://symbols.getvecta.com/stencil_37/9_switch.a8945b4320.svg"
@@ -0,0 +1,137 @@
+import json
+import mmap
+import os
+import struct
+from array import array
+
+MAGIC = b'DBARUN1\n'
+HEADER_LENGTH = struct.Struct('<I')
+CYCLE_HEADER = struct.Struct('<I')  # number of ONU entries in the cycle
+ONU_ENTRY = struct.Struct('<I4d')  # ONU index, FT1..FT4
+
+def index_path(path: str) -> str:
+    return path + '.idx'
+
+class RunRecorder:
+    """
+    Writes the allocations of a run to a compact binary file.
+
+    Layout: MAGIC, the JSON list of ONU ids (length prefixed), then one record per cycle with
+    only the ONUs that got bandwidth. The byte offset of every record is appended to a sidecar
+    index (uint64 per cycle), so a reader can seek to any cycle without scanning the file.
+    """
+
+    def __init__(self, path: str, onu_ids: list[str]):
+        self.path = path
+        self.onu_index: dict[str, int] = {onu_id: i for i, onu_id in enumerate(onu_ids)}
+        self.cycles: int = 0
+
+        header = json.dumps(list(onu_ids)).encode('utf-8')
+        self.file = open(path, 'wb')
+        self.file.write(MAGIC + HEADER_LENGTH.pack(len(header)) + header)
+        self.offset: int = self.file.tell()
+        self.index_file = open(index_path(path), 'wb')
+
+    def write_cycle(self, allocations: dict[str, dict[int, float]]):
+        entries = []
+        for onu_id, alloc in allocations.items():
+            ft = (alloc.get(1, 0), alloc.get(2, 0), alloc.get(3, 0), alloc.get(4, 0))
+            if any(ft):
+                entries.append(ONU_ENTRY.pack(self.onu_index[onu_id], *ft))
+        record = CYCLE_HEADER.pack(len(entries)) + b''.join(entries)
+        self.file.write(record)
+        self.index_file.write(struct.pack('<Q', self.offset))
+        self.offset += len(record)
+        self.cycles += 1
+
+    def close(self):
+        self.file.close()
+        self.index_file.close()
+
+class RunReader:
+    """
+    Random access to a recorded run.
+
+    The run file and its index are memory mapped, so opening a run costs the same whatever its
+    length and only the pages of the cycles actually read are loaded.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.index_file = None
+        self.index_data = None
+        self.offsets = array('Q')
+        if self.data[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a recorded simulation run.")
+
+        header_length, = HEADER_LENGTH.unpack_from(self.data, len(MAGIC))
+        header_start = len(MAGIC) + HEADER_LENGTH.size
+        self.onu_ids: list[str] = json.loads(self.data[header_start:header_start + header_length].decode('utf-8'))
+        self.first_offset: int = header_start + header_length
+        self.offsets = self._load_index()
+
+    def _load_index(self):
+        path = index_path(self.path)
+        if os.path.exists(path) and os.path.getsize(path) > 0 and os.path.getsize(path) % 8 == 0:
+            self.index_file = open(path, 'rb')
+            self.index_data = mmap.mmap(self.index_file.fileno(), 0, access=mmap.ACCESS_READ)
+            offsets = memoryview(self.index_data).cast('Q')
+            end = self._ends_at(offsets[-1])
+            # Valid when it covers every complete record, a torn tail is ignored
+            if 0 <= end <= len(self.data) and not 0 <= self._ends_at(end) <= len(self.data):
+                return offsets
+            # Stale index, e.g. the run was interrupted between the two writes
+            offsets.release()
+            self.index_data.close()
+            self.index_file.close()
+            self.index_file = self.index_data = None
+        return self._build_index()
+
+    def _ends_at(self, offset: int) -> int:
+        if offset + CYCLE_HEADER.size > len(self.data):
+            return -1
+        count, = CYCLE_HEADER.unpack_from(self.data, offset)
+        return offset + CYCLE_HEADER.size + count * ONU_ENTRY.size
+
+    def _build_index(self):
+        # Walks the record headers once and drops a trailing record torn by a crash
+        offsets = array('Q')
+        offset = self.first_offset
+        while 0 <= self._ends_at(offset) <= len(self.data):
+            offsets.append(offset)
+            offset = self._ends_at(offset)
+        with open(index_path(self.path), 'wb') as index_file:
+            offsets.tofile(index_file)
+        return offsets
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def cycle(self, cycle: int) -> dict[str, dict[int, float]]:
+        """
+        Reads the allocations of one cycle.
+
+        Args:
+            cycle (int): Zero-based cycle number.
+
+        Returns:
+            dict[str, dict[int, float]]: Allocation per T-Cont of the ONUs that got bandwidth in that cycle.
+        """
+        offset = self.offsets[cycle]
+        count, = CYCLE_HEADER.unpack_from(self.data, offset)
+        allocations = {}
+        for index, ft1, ft2, ft3, ft4 in ONU_ENTRY.iter_unpack(self.data[offset + CYCLE_HEADER.size:offset + CYCLE_HEADER.size + count * ONU_ENTRY.size]):
+            allocations[self.onu_ids[index]] = {1: ft1, 2: ft2, 3: ft3, 4: ft4}
+        return allocations
+
+    def close(self):
+        if isinstance(self.offsets, memoryview):
+            self.offsets.release()
+        if self.index_data:
+            self.index_data.close()
+            self.index_file.close()
+        self.data.close()
+        self.file.close()
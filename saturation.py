@@ -0,0 +1,151 @@
+import random
+from dba import DBA_Simulator, ONU
+
+def onu_class(onu: ONU) -> tuple:
+    # ONUs with the same maximum bandwidth and traffic mix saturate together
+    return (onu.max_bw, tuple(sorted(onu.proportions.items())))
+
+class ProbeResult:
+    def __init__(self, load: float, saturated: dict[tuple,bool], delay: dict[tuple,float], cycles: int):
+        self.load = load
+        self.saturated = saturated  # ONU class -> whether the SLA is broken at this load
+        self.delay = delay  # ONU class -> mean queueing delay of the watched T-Conts, in cycles
+        self.cycles = cycles
+
+class SaturationFinder:
+    """
+    Bisects the traffic load multiplier at which the queueing delay of the watched T-Conts breaks the SLA.
+
+    Each probe runs the simulator in windows of cycles and stops as soon as every ONU class has
+    clearly diverged (delay above the SLA, or backlog piling up faster than growth_tolerance of
+    the offered traffic) or clearly converged (delay under the SLA and backlog flat) for
+    settle_windows windows in a row. Probes share one seed, and start from the warmed-up state of the
+    highest load known to be stable, so most of them skip the warm-up transient.
+    """
+
+    def __init__(self, ONUS: list[ONU], groups: list[list[str]], Tm: float, sla_delay: float, tconts: tuple[int,...] = (2, 3), policy: str = "bexcess", seed: int = 0, window: int = 50, max_cycles: int = 2000, settle_windows: int = 3, growth_tolerance: float = 0.25):
+        self.base = DBA_Simulator(ONUS, groups, Tm, policy=policy)
+        self.sla_delay = sla_delay
+        self.tconts = tconts
+        self.seed = seed
+        self.window = window
+        self.max_cycles = max_cycles
+        self.settle_windows = settle_windows
+        self.growth_tolerance = growth_tolerance
+        self.classes: dict[tuple,list[str]] = {}
+        for onu_id, onu in self.base.ONUs.items():
+            self.classes.setdefault(onu_class(onu), []).append(onu_id)
+        self.probes: list[ProbeResult] = []
+        self.warm_state: DBA_Simulator | None = None
+
+    def _class_totals(self, simulator: DBA_Simulator, onu_ids: list[str]) -> tuple[float,int,float,float]:
+        delay = packets = arrived = backlog = 0
+        for onu_id in onu_ids:
+            onu = simulator.ONUs[onu_id]
+            for t in self.tconts:
+                delay += onu.tcont_delay[t]
+                packets += onu.tcont_packets[t]
+                arrived += onu.arrived[t]
+                backlog += onu.pending[t]
+        return delay, packets, arrived, backlog
+
+    def probe(self, load: float) -> ProbeResult:
+        # Start from the closest stable state below this load, if there is one
+        if self.warm_state is not None and self.warm_state.load < load:
+            simulator = self.warm_state.snapshot(rng=random.Random(self.seed))
+        else:
+            simulator = self.base.snapshot(rng=random.Random(self.seed))
+        simulator.load = load
+
+        previous = {key: self._class_totals(simulator, onu_ids) for key, onu_ids in self.classes.items()}
+        streaks = {key: 0 for key in self.classes}  # > 0 diverging windows in a row, < 0 converging ones
+        window_delay = {key: 0.0 for key in self.classes}
+        decided: dict[tuple,bool] = {}
+        cycles = 0
+
+        while len(decided) < len(self.classes) and cycles < self.max_cycles:
+            for _ in range(self.window):
+                simulator.simulate_cycle()
+            cycles += self.window
+
+            for key, onu_ids in self.classes.items():
+                if key in decided:
+                    continue
+                totals = self._class_totals(simulator, onu_ids)
+                delay, packets, arrived, growth = (new - old for new, old in zip(totals, previous[key]))
+                previous[key] = totals
+                # A window without any transmission is as bad as it gets, unless nothing arrived either
+                window_delay[key] = delay/packets if packets else (float('inf') if growth > 0 else 0.0)
+                # Packets the DBA never serves do not show up in the delay, only in the backlog growth
+                if window_delay[key] > self.sla_delay or growth > self.growth_tolerance * arrived:
+                    streaks[key] = max(streaks[key], 0) + 1
+                else:
+                    streaks[key] = min(streaks[key], 0) - 1
+                if abs(streaks[key]) >= self.settle_windows:
+                    decided[key] = streaks[key] > 0
+
+        # Classes still undecided at max_cycles are judged on their last windows
+        saturated = {key: decided.get(key, streaks[key] > 0) for key in self.classes}
+        result = ProbeResult(load, saturated, dict(window_delay), cycles)
+        self.probes.append(result)
+
+        if not any(saturated.values()) and (self.warm_state is None or self.warm_state.load < load):
+            self.warm_state = simulator
+        return result
+
+    def find(self, low: float = 0.1, high: float = 4.0, tolerance: float = 0.05) -> dict[tuple,float|None]:
+        """
+        Finds the saturation load of every ONU class.
+
+        Args:
+            low (float): Lowest load multiplier searched.
+            high (float): Highest load multiplier searched.
+            tolerance (float): Relative width of the final interval.
+
+        Returns:
+            dict[tuple,float|None]: Per ONU class (max_bw, proportions), the lowest load found to break
+            the SLA, low when already broken at low, or None when still met at high.
+        """
+        if low <= 0 or high <= low:
+            raise ValueError("The load range must satisfy 0 < low < high.")
+        bounds: dict[tuple,list[float]] = {}
+        result: dict[tuple,float|None] = {}
+
+        low_probe = self.probe(low)
+        high_probe = self.probe(high)
+        for key in self.classes:
+            if low_probe.saturated[key]:
+                result[key] = low
+            elif not high_probe.saturated[key]:
+                result[key] = None
+            else:
+                bounds[key] = [low, high]
+
+        while bounds:
+            # The widest interval drives the next probe, which narrows every interval it falls into
+            key = max(bounds, key=lambda k: bounds[k][1]/bounds[k][0])
+            load = (bounds[key][0] + bounds[key][1])/2
+            probe = self.probe(load)
+            for class_key, (lo, hi) in list(bounds.items()):
+                if lo < load < hi:
+                    # Saturated moves the upper bound down, stable moves the lower bound up
+                    bounds[class_key][probe.saturated[class_key]] = load
+                if bounds[class_key][1]/bounds[class_key][0] - 1 <= tolerance:
+                    result[class_key] = bounds[class_key][1]
+                    del bounds[class_key]
+        return result
+
+
+if __name__ == "__main__":
+    # Usage example
+    ONUS = [
+        ONU("ONU1", 10, 1000, {1:0, 2:0.6, 3:0.2, 4:0.2}),
+        ONU("ONU2", 10, 1000, {1:0, 2:0.6, 3:0.2, 4:0.2}),
+        ONU("ONU3", 10, 2000, {1:0, 2:0.8, 3:0.2, 4:0}),
+        ONU("ONU4", 10, 2000, {1:0, 2:0.8, 3:0.2, 4:0})
+    ]
+
+    finder = SaturationFinder(ONUS, [["ONU1", "ONU2", "ONU3", "ONU4"]], 0.025, sla_delay=2, window=25, max_cycles=500)
+    for (max_bw, proportions), load in finder.find(low=0.5, high=60, tolerance=0.1).items():
+        print(f"Max BW {max_bw}, proportions {dict(proportions)}: saturation load {load if load is not None else 'above range'}")
+    print(f"{len(finder.probes)} probes, {sum(probe.cycles for probe in finder.probes)} cycles")
@@ -1,20 +1,38 @@
 import sys
 import os
-import folium
-import subprocess
-from PyQt5.QtCore import QUrl, pyqtSlot, pyqtSignal, pyqtProperty
-from PyQt5.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QWidget, QHBoxLayout, QPushButton, QScrollArea, QFrame, QLabel, QInputDialog, QMessageBox, QFileDialog, QGroupBox, QSlider
-from PyQt5.QtWebEngineWidgets import QWebEngineView
+import hashlib
+import tempfile
+from PyQt5.QtCore import QUrl, QCoreApplication, pyqtSlot, pyqtSignal, pyqtProperty
+from PyQt5.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QWidget, QHBoxLayout, QPushButton, QScrollArea, QFrame, QLabel, QInputDialog, QMessageBox, QFileDialog, QGroupBox, QSlider, QCheckBox, QSplitter
 from PyQt5.QtWebChannel import QWebChannel
 from PyQt5.QtGui import QCursor
 from PyQt5.QtCore import Qt
 
-from typing import Optional, Dict, List, Tuple, Union
-from network_nodes import OLTNode, ONUNode, SplitterNode, Point, Connection, Node
-from network_dump import dump_network_to_csv, load_network_from_csv
-from simulation import UploadSimulation
+from typing import Optional, Dict, List, Tuple, Union, TYPE_CHECKING
+from network_nodes import OLTNode, ONUNode, SplitterNode, Point, Connection, Node, Topology
+from network_dump import dump_network_to_csv, load_network_from_csv, remove_component
+from network_journal import NetworkJournal
 import time
 
+if TYPE_CHECKING:
+    from simulation import UploadSimulation
+
+MAP_FILE = 'santiago_map.html'
+MAP_SCRIPT_FILE = 'map_script.js'
+MAP_ZOOM_START = 13
+MAP_MIN_ZOOM = 11
+AUTOSAVE_FILE = 'network_autosave.csv'
+RUNS_DIR = 'runs'
+
+STEADY_STATE_PRECISION = 0.05  # Relative half-width of the 95% intervals that ends a run
+
+def new_run_path() -> str:
+    # The file is created here so runs started within the same second never share a name
+    os.makedirs(RUNS_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix=time.strftime('run_%Y%m%d_%H%M%S_'), suffix='.dbarun', dir=RUNS_DIR)
+    os.close(fd)
+    return os.path.abspath(path)
+
 class MapApp(QMainWindow):
     
     addMarkerSignal = pyqtSignal(float, float, str, str, str)
@@ -26,23 +44,24 @@ class MapApp(QMainWindow):
     def __init__(self):
         super().__init__()
 
-        self.components: Dict[str, Node] = {}
+        # Restore the network left by the previous session, edits are journaled from here on
+        self.journal = NetworkJournal(os.path.abspath(AUTOSAVE_FILE))
+        self.components: Topology = self.journal.recover()  # Component id -> component
         self.selected_node_class: Optional[Node] = None
         self.bandwidth: int = 0
         self.traffic_proportions: Dict[int, float] = {}
         self.selected_nodes: set[str] = set()
         self.current_menu: str = 'Create Net'
-        self.upload_simulation: Optional[UploadSimulation] = None
+        self.upload_simulation: Optional['UploadSimulation'] = None
         self.speed_slider_value: int = 10
+        self.replay = None
+        self.allocation_table = None
         
         self.mapBounds = ((-33.16734, -70.32788), (-33.70830, -70.97311))
         self.center = (-33.43783, -70.65050)
 
-        # Create a map centered on Santiago de Chile
-        self.create_map()
-
-        # Get the absolute path of the map file
-        map_file_path = os.path.abspath('santiago_map.html')
+        # Create a map centered on Santiago de Chile (reuses the cached page when possible)
+        map_file_path = self.create_map()
 
         # Set up the GUI layout
         self.setWindowTitle("Interactive Map of Santiago de Chile")
@@ -56,10 +75,15 @@ class MapApp(QMainWindow):
         self.create_lateral_menu(main_layout)
 
         # Create and set up the web view
+        # QtWebEngine is only loaded once the window is built, see AA_ShareOpenGLContexts in __main__
+        from PyQt5.QtWebEngineWidgets import QWebEngineView
         self.web_view = QWebEngineView()
         file_url = QUrl.fromLocalFile(map_file_path)
         self.web_view.setUrl(file_url)
-        main_layout.addWidget(self.web_view)
+        # The map shares its column with the allocation table shown during simulations
+        self.map_splitter = QSplitter(Qt.Vertical)
+        self.map_splitter.addWidget(self.web_view)
+        main_layout.addWidget(self.map_splitter)
 
         # Web channel setup
         self.channel = QWebChannel()
@@ -231,6 +255,51 @@ class MapApp(QMainWindow):
         self.speed_slider.valueChanged.connect(self.change_simulation_speed)
         simulation_layout.addWidget(self.speed_slider)
 
+        # Add steady-state stop option
+        self.steady_state_checkbox = QCheckBox("Stop at steady state")
+        simulation_layout.addWidget(self.steady_state_checkbox)
+
+        # Add run recording option
+        self.record_checkbox = QCheckBox("Record run")
+        self.record_checkbox.setChecked(True)
+        simulation_layout.addWidget(self.record_checkbox)
+
+        # Add Edit ONU button
+        edit_onu_button = QPushButton("Edit ONU")
+        edit_onu_button.clicked.connect(self.edit_selected_onu)
+        edit_onu_button.setStyleSheet("""
+            QPushButton {
+                background-color: #ffffff;
+                border: 1px solid #d0d0d0;
+                padding: 5px;
+                margin: 2px;
+            }
+        """)
+        simulation_layout.addWidget(edit_onu_button)
+
+        # Add Open Replay button
+        open_replay_button = QPushButton("Open Replay")
+        open_replay_button.clicked.connect(self.open_replay)
+        open_replay_button.setStyleSheet("""
+            QPushButton {
+                background-color: #ffffff;
+                border: 1px solid #d0d0d0;
+                padding: 5px;
+                margin: 2px;
+            }
+        """)
+        simulation_layout.addWidget(open_replay_button)
+
+        # Add Replay timeline, shown once a recorded run is opened
+        self.replay_label = QLabel("Replay")
+        self.replay_label.setVisible(False)
+        simulation_layout.addWidget(self.replay_label)
+        self.replay_slider = QSlider(Qt.Horizontal)
+        self.replay_slider.setMinimum(0)
+        self.replay_slider.setVisible(False)
+        self.replay_slider.valueChanged.connect(self.seek_replay)
+        simulation_layout.addWidget(self.replay_slider)
+
         # Add Go Back button
         go_back_button = QPushButton("Go Back")
         go_back_button.clicked.connect(self.go_back_to_net_creation)
@@ -262,17 +331,39 @@ class MapApp(QMainWindow):
             if isinstance(component, ONUNode):
                 component.get_olt_connection_ids()
 
+        from simulation import UploadSimulation
+
+        self.release_upload_simulation()
         # Connect the updatePathSignal to show_onu_path
         self.upload_simulation = UploadSimulation(
             onu_ids=[component.id for component in self.components.values() if isinstance(component, ONUNode)],
             components=self.components
         )
         self.upload_simulation.updatePathSignal.connect(self.show_onu_path)
+        self.show_allocation_table()
+
+    def show_allocation_table(self):
+        from allocation_table import AllocationTable
+
+        if self.allocation_table is None:
+            self.allocation_table = AllocationTable()
+            self.map_splitter.addWidget(self.allocation_table)
+            self.map_splitter.setSizes([600, 200])
+        self.allocation_table.set_simulation(self.upload_simulation)
+        self.allocation_table.setVisible(True)
+
+    def release_upload_simulation(self):
+        # The previous run must let go of its process and shared memory before it is replaced
+        if self.upload_simulation:
+            self.upload_simulation.shutdown()
 
     def go_back_to_net_creation(self):
+        self.release_upload_simulation()
         self.simulation_group.setVisible(False)
         self.create_net_group.setVisible(True)
         self.current_menu = 'Create Net'
+        if self.allocation_table:
+            self.allocation_table.setVisible(False)
 
     @pyqtSlot(object)
     def add_component(self, component_class):
@@ -281,46 +372,70 @@ class MapApp(QMainWindow):
         QApplication.setOverrideCursor(Qt.CrossCursor)  # Change cursor to cross
 
         if component_class == ONUNode:
-            
-            bandwidth, ok = QInputDialog.getInt(self, "Input Bandwidth", "Enter bandwidth for ONU (Mbps):")
-            if ok:
-                self.bandwidth = bandwidth
-            
-            else:
-                self.selected_node_class = None
-                QApplication.setOverrideCursor(Qt.ArrowCursor)
-                return
-                
-            dialog = QInputDialog(self)
-            dialog.setWindowTitle("Input Traffic Proportions")
-            dialog.setLabelText("Enter traffic proportions for T-CONT 1 to 4:")
-            dialog.setInputMode(QInputDialog.DoubleInput)
-            dialog.setDoubleDecimals(2)
-            dialog.setDoubleRange(0, 1)
-            dialog.setDoubleStep(0.01)
-
-            proportions = []
-            for i in range(4):
-                dialog.setLabelText(f"Enter traffic proportion for T-CONT {i + 1}:")
-                if dialog.exec_() == QInputDialog.Accepted:
-                    proportions.append(dialog.doubleValue())
-                else:
-                    self.selected_node_class = None
-                    QApplication.setOverrideCursor(Qt.ArrowCursor)
-
-            if len(proportions) == 4 and sum(proportions) == 1:
-                self.traffic_proportions = {i + 1: proportions[i] for i in range(4)}
+            parameters = self.ask_onu_parameters()
+            if parameters:
+                self.bandwidth, self.traffic_proportions = parameters
             else:
-                QMessageBox.critical(self, "Input Error", "Invalid input. Please enter four values between 0 and 1 that sum to 1.")
                 self.selected_node_class = None
                 QApplication.setOverrideCursor(Qt.ArrowCursor)
-                
+
+    def ask_onu_parameters(self, bandwidth: int = 0) -> Optional[Tuple[int, Dict[int, float]]]:
+        bandwidth, ok = QInputDialog.getInt(self, "Input Bandwidth", "Enter bandwidth for ONU (Mbps):", bandwidth)
+        if not ok:
+            return None
+            
+        dialog = QInputDialog(self)
+        dialog.setWindowTitle("Input Traffic Proportions")
+        dialog.setLabelText("Enter traffic proportions for T-CONT 1 to 4:")
+        dialog.setInputMode(QInputDialog.DoubleInput)
+        dialog.setDoubleDecimals(2)
+        dialog.setDoubleRange(0, 1)
+        dialog.setDoubleStep(0.01)
+
+        proportions = []
+        for i in range(4):
+            dialog.setLabelText(f"Enter traffic proportion for T-CONT {i + 1}:")
+            if dialog.exec_() == QInputDialog.Accepted:
+                proportions.append(dialog.doubleValue())
+
+        if len(proportions) == 4 and sum(proportions) == 1:
+            return bandwidth, {i + 1: proportions[i] for i in range(4)}
+        QMessageBox.critical(self, "Input Error", "Invalid input. Please enter four values between 0 and 1 that sum to 1.")
+        return None
+
+    def edit_selected_onu(self):
+        # What-if changes on the ONU selected on the map, applied to the running simulation as well
+        onu_ids = [index for index in self.selected_nodes if isinstance(self.components.get(index), ONUNode)]
+        if not onu_ids:
+            QMessageBox.warning(self, "No ONU Selected", "Select an ONU on the map first.")
+            return
+        onu = self.components[onu_ids[0]]
+        parameters = self.ask_onu_parameters(onu.bandwidth)
+        if not parameters:
+            return
+        group = None
+        if self.upload_simulation and self.upload_simulation.isRunning():
+            # Groups only exist within a run, so they are not journaled with the network
+            groups = len(self.upload_simulation.groups)
+            number, ok = QInputDialog.getInt(self, "Input Group", f"DBA group of the ONU (1-{groups}, {groups + 1} for a new group):", self.upload_simulation.group_of(onu.id) + 1, 1, groups + 1)
+            if ok:
+                group = number - 1
+        onu.bandwidth, onu.traffic_proportions = parameters
+        self.journal.record_update(onu)
+        if self.upload_simulation:
+            self.upload_simulation.update_onu(onu.id, bandwidth=onu.bandwidth, traffic_proportions=onu.traffic_proportions, group=group)
 
     def select_connection_mode(self):
         self.selected_node_class = "Connection"
         self.selectedComponentTypeChanged.emit()
         QApplication.setOverrideCursor(Qt.PointingHandCursor)  # Change cursor to pointing hand
 
+    @pyqtSlot()
+    def mapReady(self):
+        # Called by map_script.js once the web channel is up
+        if self.components:
+            self.load_components_to_map()
+
     @pyqtSlot(str)
     def log(self, msg):
         print(f"JS LOG: {msg}")
@@ -351,10 +466,10 @@ class MapApp(QMainWindow):
             pass
         elif self.selected_node_class is not None:
             if self.selected_node_class == ONUNode:
-                component = self.selected_node_class(lat, lng, bandwidth=self.bandwidth, traffic_proportions=self.traffic_proportions)
+                component = self.selected_node_class(lat, lng, bandwidth=self.bandwidth, traffic_proportions=self.traffic_proportions, topology=self.components)
             else:
-                component = self.selected_node_class(lat, lng)
-            self.components[component.id] = component
+                component = self.selected_node_class(lat, lng, topology=self.components)
+            self.journal.record_add(component)
             self.addMarkerSignal.emit(lat, lng, self.selected_node_class.__name__, component.id, component.icon_url)
             print(self.components)
         else:
@@ -370,7 +485,7 @@ class MapApp(QMainWindow):
 
             try:
                 connection = component1.connect(component2)
-                self.components[connection.id] = connection
+                self.journal.record_add(connection)
                 self.addConnectionSignal.emit(component1.lat, component1.lon, component2.lat, component2.lon, connection.id, 'blue')
             except ValueError as e:
                 QMessageBox.critical(self, "Connection Error", str(e))
@@ -378,11 +493,40 @@ class MapApp(QMainWindow):
                 self.selected_nodes.clear()
             print(self.components)
 
-    def create_map(self):
+    def map_cache_key(self) -> str:
+        """
+        Returns a fingerprint of every input that ends up in the generated map page.
+
+        Returns:
+            str: Hex digest that changes whenever the center, bounds, zoom or injected scripts change.
+        """
+        script_path = os.path.abspath(MAP_SCRIPT_FILE)
+        inputs = (self.center, self.mapBounds, MAP_ZOOM_START, MAP_MIN_ZOOM, script_path)
+        return hashlib.sha1(repr(inputs).encode('utf-8')).hexdigest()
+
+    def create_map(self) -> str:
+        """
+        Writes the map page only when its inputs changed since the last launch.
+
+        Folium is imported lazily, so a launch that reuses the cached page never pays for it.
+
+        Returns:
+            str: Absolute path of the map page.
+        """
+        map_file_path = os.path.abspath(MAP_FILE)
+        cache_marker = f"<!-- map-cache-key: {self.map_cache_key()} -->"
+
+        if os.path.exists(map_file_path):
+            with open(map_file_path, 'r', encoding='utf-8') as html_file:
+                if cache_marker in html_file.read():
+                    return map_file_path
+
+        import folium
+
         self.map = folium.Map(
             location=self.center,
-            zoom_start=13,
-            min_zoom=11,
+            zoom_start=MAP_ZOOM_START,
+            min_zoom=MAP_MIN_ZOOM,
             min_lat=self.mapBounds[1][0],
             max_lat=self.mapBounds[0][0],
             min_lon=self.mapBounds[1][1],
@@ -390,18 +534,18 @@ class MapApp(QMainWindow):
             max_bounds=True
         )
 
-        # Add existing components to the map
-        for component in self.components.values():
-            folium.Marker(location=component['coords'], popup=component['type'].name).add_to(self.map)
+        # Components are never baked into the page, they are pushed through addMarkerSignal/addConnectionSignal
 
         # Add external JavaScript file to the HTML
-        script_path = os.path.abspath('map_script.js')
+        script_path = os.path.abspath(MAP_SCRIPT_FILE)
         self.map.get_root().html.add_child(folium.Element(f"""
+            {cache_marker}
             <script src="qrc:///qtwebchannel/qwebchannel.js"></script>
             <script src="file://{script_path}"></script>
         """))
 
-        self.map.save('santiago_map.html')
+        self.map.save(map_file_path)
+        return map_file_path
         
     def load_components_to_map(self):
         self.cleanMapSignal.emit()
@@ -414,14 +558,8 @@ class MapApp(QMainWindow):
     @pyqtSlot(str)
     def removeComponent(self, index):
         if index in self.components:
-            component = self.components[index]
-            if isinstance(component, Connection):
-                component.remove()
-            else:
-                for connection in component.connections[:]:
-                    del self.components[connection.id]
-                    connection.remove()
-            del self.components[index]
+            remove_component(self.components, index)
+            self.journal.record_remove(index)
             self.load_components_to_map()
         print(index, self.components)
             
@@ -431,21 +569,26 @@ class MapApp(QMainWindow):
         self.selectedComponentTypeChanged.emit()
         
     def show_onu_path(self, onu_id = None):
+        self.show_onu_paths([onu_id] if onu_id is not None else [])
+
+    def show_onu_paths(self, onu_ids: List[str]):
         for connections in self.components.values():
             if isinstance(connections, Connection):
                 connections.selected = False
         
         selected = []
         
-        if onu_id is not None:
+        for onu_id in onu_ids:
             for connection_id in self.components[onu_id].olt_connection_ids:
-                self.components[connection_id].selected = True 
-                selected.append(connection_id)
+                if not self.components[connection_id].selected:
+                    self.components[connection_id].selected = True 
+                    selected.append(connection_id)
 
         self.highlightConnectionsSignal.emit(','.join(selected), 'red', 'blue')
 
     def open_csv_file(self):
         import tempfile
+        import subprocess
         csv_file_path = tempfile.NamedTemporaryFile(suffix='.csv', delete=False).name
         components = list(self.components.values())
         dump_network_to_csv(components, csv_file_path)
@@ -467,13 +610,21 @@ class MapApp(QMainWindow):
         file_path, _ = QFileDialog.getOpenFileName(self, "Open CSV File", "", "CSV Files (*.csv)")
         if file_path:
             self.components = load_network_from_csv(file_path)
+            self.journal.compact(self.components)
             self.load_components_to_map()
 
     def start_upload_simulation(self):
+        from simulation import UploadSimulation
+
         onu_ids = [component.id for component in self.components.values() if isinstance(component, ONUNode)]
         if onu_ids:
-            self.upload_simulation = UploadSimulation(onu_ids, self.components, speed=self.speed_slider_value*10)
+            record_path = new_run_path() if self.record_checkbox.isChecked() else None
+            self.release_upload_simulation()
+            precision = STEADY_STATE_PRECISION if self.steady_state_checkbox.isChecked() else None
+            self.upload_simulation = UploadSimulation(onu_ids, self.components, speed=self.speed_slider_value*10, record_path=record_path, precision=precision)
             self.upload_simulation.updatePathSignal.connect(self.show_onu_path)
+            self.upload_simulation.steadyStateSignal.connect(self.steady_state_reached)
+            self.show_allocation_table()
             self.upload_simulation.start()
             self.selected_node_class = None 
             self.selected_nodes.clear()
@@ -485,6 +636,10 @@ class MapApp(QMainWindow):
             self.show_onu_path()  
             self.selected_node_class = None 
 
+    def steady_state_reached(self, cycles, warmup):
+        self.show_onu_path()
+        QMessageBox.information(self, "Steady State", f"The simulation reached steady state after {cycles} cycles and stopped.\nThe first {warmup} cycles were discarded as warm-up.")
+
     def export_simulation_history(self):
         if self.upload_simulation:
             file_path, _ = QFileDialog.getSaveFileName(self, "Save Simulation History", "", "CSV Files (*.csv)")
@@ -494,6 +649,41 @@ class MapApp(QMainWindow):
         else:
             QMessageBox.warning(self, "No Data", "No simulation history to export.")
 
+    def open_replay(self):
+        from run_recording import RunReader
+
+        file_path, _ = QFileDialog.getOpenFileName(self, "Open Recorded Run", RUNS_DIR, "Recorded Runs (*.dbarun)")
+        if not file_path:
+            return
+        if self.upload_simulation and self.upload_simulation.isRunning():
+            self.stop_upload_simulation()
+        try:
+            replay = RunReader(file_path)
+        except (OSError, ValueError) as e:
+            QMessageBox.critical(self, "Replay Error", str(e))
+            return
+        if len(replay) == 0:
+            replay.close()
+            QMessageBox.warning(self, "No Data", "The recorded run has no cycles.")
+            return
+        if self.replay:
+            self.replay.close()
+        self.replay = replay
+
+        self.replay_label.setVisible(True)
+        self.replay_slider.setVisible(True)
+        self.replay_slider.setMaximum(len(self.replay) - 1)
+        self.replay_slider.setValue(0)
+        self.seek_replay(0)
+
+    def seek_replay(self, cycle):
+        if not self.replay:
+            return
+        allocations = self.replay.cycle(cycle)
+        self.replay_label.setText(f"Replay cycle {cycle + 1} / {len(self.replay)}")
+        # ONUs removed from the network since the run was recorded are skipped
+        self.show_onu_paths([onu_id for onu_id in allocations if isinstance(self.components.get(onu_id), ONUNode)])
+
     def change_simulation_speed(self, value):
         self.speed_slider_value = value
         if self.upload_simulation:
@@ -507,7 +697,11 @@ class MapApp(QMainWindow):
         return 0
 
 if __name__ == "__main__":
+    # Required to import QtWebEngineWidgets after the QApplication exists
+    QCoreApplication.setAttribute(Qt.AA_ShareOpenGLContexts)
     app = QApplication(sys.argv)
     map_app = MapApp()
     map_app.show()
-    sys.exit(app.exec_())
+    exit_code = app.exec_()
+    map_app.journal.close()
+    sys.exit(exit_code)
@@ -0,0 +1,234 @@
+import time
+from multiprocessing import shared_memory
+import numpy as np
+from dba import DBA_Simulator, ONU
+from run_recording import RunRecorder
+from steady_state import SteadyStateRule
+
+RING_CYCLES = 256
+
+# Header slots (int64)
+CYCLES_WRITTEN = 0  # Cycles published so far, slot of cycle c is c % ring size
+SHOWN_ONU = 1  # Index of the ONU whose transmission is being shown, -1 for none
+FINISHED = 2  # Set by the simulation process when it exits
+RING_SIZE = 3  # Number of cycles the ring holds
+STEADY_STATE = 4  # Cycle at which the stopping rule was met, 0 while it is not
+WARMUP = 5  # Cycles the stopping rule discarded as warm-up
+WHAT_IF_UPDATES = 6  # What-if allocations published so far, times two; odd while they are being written
+WHAT_IF_CYCLE = 7  # Cycles written when the current what-if allocations were computed
+HEADER_SLOTS = 8
+
+# Per-ONU statistics columns (float64)
+AVG_LATENCY = 0
+MAX_RATE = 1
+BACKLOG = 2  # Data arrived and not transmitted yet
+P95_LATENCY = 3
+STAT_COLUMNS = 4
+
+# Log-spaced latency bins for the percentile column, 16 per decade from 0.1 us to 1000 s
+LATENCY_BIN_EDGES = np.logspace(-7, 3, 161)
+
+class LatencyPercentiles:
+    """
+    Running latency percentile of every ONU.
+
+    Each cycle the packets an ONU transmitted are counted in the histogram bin of their mean
+    latency for that cycle, so the percentile is exact to a bin (about 15%) over cycles but does not
+    see the spread of packet sizes within one cycle.
+    """
+
+    def __init__(self, onu_count: int, percentile: float = 95):
+        self.percentile = percentile
+        self.histogram = np.zeros((onu_count, len(LATENCY_BIN_EDGES) - 1))
+        self.latency = np.zeros(onu_count)
+        self.packets = np.zeros(onu_count)
+        self.values = np.zeros(onu_count)
+
+    def update(self, latency: np.ndarray, packets: np.ndarray) -> np.ndarray:
+        # latency and packets are the running totals of every ONU
+        sent = packets - self.packets
+        rows = np.flatnonzero(sent)
+        if len(rows):
+            mean = (latency[rows] - self.latency[rows]) / sent[rows]
+            bins = np.clip(np.searchsorted(LATENCY_BIN_EDGES, mean) - 1, 0, self.histogram.shape[1] - 1)
+            self.histogram[rows, bins] += sent[rows]
+            # Only ONUs that transmitted this cycle can have moved
+            cumulative = self.histogram[rows].cumsum(axis=1)
+            target = cumulative[:, -1] * self.percentile / 100
+            self.values[rows] = LATENCY_BIN_EDGES[(cumulative < target[:, None]).sum(axis=1) + 1]
+        self.latency, self.packets = latency, packets
+        return self.values
+
+class SimulationChannel:
+    """
+    Shared memory between the simulation process and the GUI.
+
+    Layout: an int64 header, a ring of the last ring_cycles allocations (cycle x ONU x T-Cont),
+    the current per-ONU statistics and the what-if allocations of the last ONU updates (ONU x
+    T-Cont). The simulation process is the only writer; it fills a ring slot before publishing it
+    through the cycle counter, so readers only need numpy views.
+    """
+
+    def __init__(self, onu_count: int, ring_cycles: int = RING_CYCLES, name: str | None = None):
+        header_size = HEADER_SLOTS * 8
+        if name is None:
+            stats_size = onu_count * STAT_COLUMNS * 8
+            self.shm = shared_memory.SharedMemory(create=True, size=header_size + ring_cycles * onu_count * 4 * 8 + stats_size + onu_count * 4 * 8)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+
+        self.header = np.ndarray((HEADER_SLOTS,), dtype=np.int64, buffer=self.shm.buf)
+        if name is not None:
+            # Attaching side, the creator stored the ring size in the header
+            ring_cycles = int(self.header[RING_SIZE])
+        self.onu_count = onu_count
+        self.ring_cycles = ring_cycles
+        ring_size = ring_cycles * onu_count * 4 * 8
+        self.ring = np.ndarray((ring_cycles, onu_count, 4), dtype=np.float64, buffer=self.shm.buf, offset=header_size)
+        self.stats = np.ndarray((onu_count, STAT_COLUMNS), dtype=np.float64, buffer=self.shm.buf, offset=header_size + ring_size)
+        self.what_if = np.ndarray((onu_count, 4), dtype=np.float64, buffer=self.shm.buf, offset=header_size + ring_size + onu_count * STAT_COLUMNS * 8)
+        if name is None:
+            self.header[:] = 0
+            self.header[SHOWN_ONU] = -1
+            self.header[RING_SIZE] = ring_cycles
+
+    def publish(self, row: np.ndarray):
+        cycle = int(self.header[CYCLES_WRITTEN])
+        self.ring[cycle % self.ring_cycles] = row
+        self.header[CYCLES_WRITTEN] = cycle + 1
+
+    def read_since(self, cycle: int) -> tuple[int, list[np.ndarray]]:
+        """
+        Views of the cycles published since a given one.
+
+        Args:
+            cycle (int): Number of cycles already consumed.
+
+        Returns:
+            tuple[int, list[np.ndarray]]: The new consumed count and one ONU x T-Cont view per
+            available cycle. Cycles already overwritten in the ring are skipped.
+        """
+        written = int(self.header[CYCLES_WRITTEN])
+        # The slot the writer fills next is left alone
+        first = max(cycle, written - self.ring_cycles + 1)
+        return written, [self.ring[c % self.ring_cycles] for c in range(first, written)]
+
+    def publish_what_if(self, rows: np.ndarray):
+        # The counter is odd while the rows are written, so a reader never keeps a half-written copy
+        self.header[WHAT_IF_UPDATES] += 1
+        self.what_if[:] = rows
+        self.header[WHAT_IF_CYCLE] = self.header[CYCLES_WRITTEN]
+        self.header[WHAT_IF_UPDATES] += 1
+
+    def read_what_if(self, updates: int) -> tuple[int, int, np.ndarray | None]:
+        """
+        The what-if allocations published since a given update, see DBA_Simulator.update_onu.
+
+        Args:
+            updates (int): Update counter already consumed.
+
+        Returns:
+            tuple[int, int, np.ndarray | None]: The new update counter, the number of cycles
+            written when the allocations were computed, and a copy of them (ONU x T-Cont, NaN for
+            the ONUs whose group was not re-evaluated). None when there is nothing new or the
+            writer was busy, in which case the next call tries again.
+        """
+        published = int(self.header[WHAT_IF_UPDATES])
+        if published == updates or published % 2:
+            return updates, 0, None
+        cycle = int(self.header[WHAT_IF_CYCLE])
+        rows = self.what_if.copy()
+        if int(self.header[WHAT_IF_UPDATES]) != published:
+            return updates, 0, None
+        return published, cycle, rows
+
+    def close(self):
+        # Views must be dropped before the buffer can be released
+        del self.header, self.ring, self.stats, self.what_if
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+def publish_stats(channel: SimulationChannel, ONUs: list[ONU], percentiles: LatencyPercentiles):
+    count = len(ONUs)
+    latency = np.fromiter((onu.total_latency for onu in ONUs), dtype=np.float64, count=count)
+    packets = np.fromiter((onu.packets_transmitted for onu in ONUs), dtype=np.float64, count=count)
+    np.divide(latency, packets, out=channel.stats[:, AVG_LATENCY], where=packets > 0)
+    channel.stats[:, MAX_RATE] = np.fromiter((onu.max_allocated_bw for onu in ONUs), dtype=np.float64, count=count)
+    # pending is a running float difference, an emptied queue can drift just below zero
+    channel.stats[:, BACKLOG] = np.maximum(np.fromiter((sum(onu.pending.values()) for onu in ONUs), dtype=np.float64, count=count), 0)
+    channel.stats[:, P95_LATENCY] = percentiles.update(latency, packets)
+
+def run_simulation(channel_name: str, onus: list[tuple], groups: list[list[str]], policy: str, speed: float, control, record_path: str | None = None, precision: float | None = None):
+    # Entry point of the simulation process; onus holds (onu_id, max_bw, proportions, rtt) tuples.
+    # With a precision the process stops by itself once the run is at steady state
+    channel = SimulationChannel(len(onus), name=channel_name)
+    ONUs = [ONU(onu_id, buffer_size=10, max_bw=max_bw, proportions=proportions, rtt=rtt) for onu_id, max_bw, proportions, rtt in onus]
+    simulator = DBA_Simulator(ONUS=ONUs, groups=groups, Tm=0.0025, policy=policy)
+    onu_ids = [onu.onu_id for onu in ONUs]
+    recorder = RunRecorder(record_path, onu_ids) if record_path else None
+    rule = SteadyStateRule(onu_ids, precision=precision) if precision else None
+    percentiles = LatencyPercentiles(len(onu_ids))
+    onu_index = {onu_id: index for index, onu_id in enumerate(onu_ids)}
+    # What-if allocations of every update since the last cycle, NaN for the groups none of them touched
+    what_if = np.full((len(onu_ids), 4), np.nan)
+    state = {'running': True, 'speed': speed}
+
+    def handle_commands():
+        while control.poll():
+            command, *args = control.recv()
+            if command == 'stop':
+                state['running'] = False
+            elif command == 'speed':
+                state['speed'] = args[0]
+            elif command == 'update_onu':
+                onu_id, max_bw, proportions, group = args
+                allocations = simulator.update_onu(onu_id, max_bw=max_bw, proportions=proportions, group=group)
+                for updated_id, alloc in allocations.items():
+                    what_if[onu_index[updated_id]] = (alloc.get(1, 0), alloc.get(2, 0), alloc.get(3, 0), alloc.get(4, 0))
+                channel.publish_what_if(what_if)
+
+    def pause(seconds: float):
+        # Sleeps in short steps so stop and speed changes take effect right away
+        deadline = time.monotonic() + seconds
+        while state['running']:
+            handle_commands()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(remaining, 0.05))
+
+    row = np.zeros((len(onu_ids), 4))
+    try:
+        while state['running']:
+            handle_commands()
+            allocations = simulator.simulate_cycle()
+            for index, onu_id in enumerate(onu_ids):
+                alloc = allocations.get(onu_id, {})
+                row[index] = (alloc.get(1, 0), alloc.get(2, 0), alloc.get(3, 0), alloc.get(4, 0))
+            publish_stats(channel, ONUs, percentiles)
+            channel.publish(row)
+            what_if[:] = np.nan
+            if recorder:
+                recorder.write_cycle(allocations)
+            if rule and rule.observe(simulator, allocations):
+                channel.header[WARMUP] = rule.warmup
+                channel.header[STEADY_STATE] = rule.cycles
+                break
+
+            # Same pacing as the in-GUI simulation had: one step per ONU that transmits
+            for index, total_allocated_bw in enumerate(row.sum(axis=1)):
+                if not state['running']:
+                    break
+                if total_allocated_bw > 0:
+                    channel.header[SHOWN_ONU] = index
+                    pause(total_allocated_bw/state['speed'])
+            # Sleep between cycles
+            pause(0.5)
+    finally:
+        if recorder:
+            recorder.close()
+        channel.header[FINISHED] = 1
+        channel.close()
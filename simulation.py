@@ -1,48 +1,173 @@
-from PyQt5.QtCore import QThread, pyqtSignal
-import time
-import random
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+import multiprocessing
 import csv
-from dba import DBA_Simulator, ONU
+import numpy as np
+from history import AllocationHistory
 from network_nodes import ONUNode
+from sim_process import SimulationChannel, run_simulation, SHOWN_ONU, FINISHED, STEADY_STATE, WARMUP, STAT_COLUMNS, AVG_LATENCY, MAX_RATE
 
-class UploadSimulation(QThread):
+class UploadSimulation(QObject):
+    """
+    GUI side of a simulation running in its own process.
+
+    The DBA loop runs in a child process (see sim_process.run_simulation) so it never competes
+    with the Qt event loop for the GIL. Results come back through a shared-memory ring buffer
+    that a timer polls; start/stop/speed/ONU updates go over a one-way pipe.
+    """
     updatePathSignal = pyqtSignal(str)
+    steadyStateSignal = pyqtSignal(int, int)  # Cycles simulated, cycles discarded as warm-up
 
-    def __init__(self, onu_ids, components: dict[str, ONUNode], speed=0.1):
+    def __init__(self, onu_ids, components: dict[str, ONUNode], speed=0.1, policy="bexcess", record_path=None, poll_interval=50, precision=None):
         super().__init__()
         self.onu_ids = onu_ids
         self.components = components
-        self.speed = speed
-        self.running = True
-        self.traffic = []
-        self.history = []
-        
-        ONUs = []
-        for onu_id in onu_ids:
-            ONUs.append(ONU(onu_id, buffer_size=10, max_bw=components[onu_id].bandwidth, proportions=components[onu_id].traffic_proportions))
-        
-        self.dba_simulator = DBA_Simulator(
-            ONUS=ONUs,
-            groups=[self.onu_ids],
-            Tm=0.0025
+        self._speed = speed
+        self.policy = policy
+        self.history = AllocationHistory(onu_ids, [components[onu_id].bandwidth for onu_id in onu_ids])
+        self.record_path = record_path
+        self.precision = precision  # Relative precision that stops the run, see steady_state.py
+        # Latest per-ONU allocation and statistics, kept after the process exits for export_history
+        self.current = np.zeros((len(onu_ids), 4))
+        self.stats = np.zeros((len(onu_ids), STAT_COLUMNS))
+        # DBA groups, kept in step with the simulation process as ONUs are moved between them
+        self.groups: list[list[str]] = [list(onu_ids)]
+
+        self.channel: SimulationChannel | None = None
+        self.process = None
+        self.control = None
+        self.cycles_read = 0
+        self.what_if_read = 0  # What-if update counter consumed, see SimulationChannel.read_what_if
+        self.shown_onu = -1
+        self.timer = QTimer(self)
+        self.timer.setInterval(poll_interval)
+        self.timer.timeout.connect(self.poll)
+
+    @property
+    def speed(self):
+        return self._speed
+
+    @speed.setter
+    def speed(self, value):
+        self._speed = value
+        self.send('speed', value)
+
+    def send(self, *command):
+        # The process can exit between the check and the send, which then finds the pipe closed
+        if self.control and self.isRunning():
+            try:
+                self.control.send(command)
+            except (BrokenPipeError, OSError):
+                pass
+
+    def start(self):
+        if self.isRunning():
+            return
+        # spawn keeps the child free of the parent's Qt state
+        context = multiprocessing.get_context('spawn')
+        self.channel = SimulationChannel(len(self.onu_ids))
+        receiver, self.control = context.Pipe(duplex=False)
+        onus = [(onu_id, self.components[onu_id].bandwidth, self.components[onu_id].traffic_proportions, self.components[onu_id].rtt) for onu_id in self.onu_ids]
+        self.process = context.Process(
+            target=run_simulation,
+            args=(self.channel.name, onus, [list(group) for group in self.groups], self.policy, self._speed, receiver, self.record_path, self.precision),
+            daemon=True
         )
+        self.process.start()
+        receiver.close()
+        self.cycles_read = 0
+        self.what_if_read = 0
+        self.shown_onu = -1
+        self.timer.start()
+
+    def isRunning(self):
+        return self.process is not None and self.process.is_alive()
+
+    def poll(self):
+        if self.channel is None:
+            return
+        # Checked before reading: the process sets FINISHED after publishing its last cycle, so
+        # once it is seen here the read below is sure to include that cycle
+        finished = bool(self.channel.header[FINISHED]) or not self.isRunning()
+        self._collect()
 
-    def run(self):
-        while self.running:
-            allocations = self.dba_simulator.simulate_cycle()
-            self.history.append(allocations)
+        shown_onu = int(self.channel.header[SHOWN_ONU])
+        if shown_onu != self.shown_onu and shown_onu >= 0:
+            self.shown_onu = shown_onu
+            self.updatePathSignal.emit(self.onu_ids[shown_onu])
 
-            for onu_id, allocation in allocations.items():
-                total_allocated_bw = sum(allocation.values())
-                if total_allocated_bw > 0:
-                    self.updatePathSignal.emit(onu_id)
-                    
-                    time.sleep(total_allocated_bw/self.speed)
-            # Sleep between cycles
-            time.sleep(0.5)
+        if finished:
+            steady_state, warmup = int(self.channel.header[STEADY_STATE]), int(self.channel.header[WARMUP])
+            self._release()
+            if steady_state:
+                self.steadyStateSignal.emit(steady_state, warmup)
+
+    def _collect(self):
+        # Everything published since the last poll: new cycles, statistics and what-if allocations
+        self.cycles_read, rows = self.channel.read_since(self.cycles_read)
+        for row in rows:
+            self.history.append_array(row)
+        if rows:
+            self.current[:] = rows[-1]
+            self.stats[:] = self.channel.stats
+        self.what_if_read, cycle, what_if = self.channel.read_what_if(self.what_if_read)
+        if what_if is not None and cycle == self.cycles_read:
+            # Only ONUs of the re-evaluated groups change; a later cycle already supersedes them
+            updated = ~np.isnan(what_if[:, 0])
+            self.current[updated] = what_if[updated]
+
+    def _release(self):
+        self.timer.stop()
+        if self.process is not None:
+            self.process.join(timeout=1)
+        self.channel.close()
+        self.channel.unlink()
+        self.channel = None
+        if self.control:
+            self.control.close()
+            self.control = None
+
+    def shutdown(self, timeout: float = 5):
+        """
+        Stops the run and releases its process, pipe and shared memory before returning.
+
+        Call it before dropping the object: the timer that would otherwise clean up dies with it.
+        The cycles published until the process stopped still reach the history.
+
+        Args:
+            timeout (float): Seconds the process gets to finish its step before it is terminated.
+        """
+        if self.channel is None:
+            return
+        self.send('stop')
+        if self.process is not None:
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join()
+        self._collect()
+        self._release()
 
     def stop(self):
-        self.running = False
+        # The process finishes its current step, the timer collects what is left and cleans up
+        self.send('stop')
+
+    def group_of(self, onu_id) -> int:
+        return next(i for i, group in enumerate(self.groups) if onu_id in group)
+
+    def update_onu(self, onu_id, bandwidth=None, traffic_proportions=None, group=None):
+        # Applied by the simulation process between steps, see DBA_Simulator.update_onu; the
+        # what-if allocations of the affected groups show up in current at the next poll
+        if group is not None:
+            if not 0 <= group <= len(self.groups):
+                raise ValueError(f"Group {group} does not exist.")
+            if group != self.group_of(onu_id):
+                if group == len(self.groups):
+                    self.groups.append([])
+                self.groups[self.group_of(onu_id)].remove(onu_id)
+                self.groups[group].append(onu_id)
+        if bandwidth is not None:
+            self.history.set_max_bw(onu_id, bandwidth)
+        self.send('update_onu', onu_id, bandwidth, traffic_proportions, group)
 
     def export_history(self, file_path):
         with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
@@ -50,25 +175,23 @@ class UploadSimulation(QThread):
             writer = csv.DictWriter(csvfile, fieldnames=fieldnames, delimiter=';')
             writer.writeheader()
             
-            for iteration, allocations in enumerate(self.history, start=1):
-                for onu_id, alloc in allocations.items():
-                    ft1 = alloc.get(1, 0)
-                    ft2 = alloc.get(2, 0)
-                    ft3 = alloc.get(3, 0)
-                    ft4 = alloc.get(4, 0)
-                    fttotal = ft1 + ft2 + ft3 + ft4
-                    onu = self.dba_simulator.ONUs[onu_id]
-                    avg_latency = (onu.total_latency / onu.packets_transmitted) if onu.packets_transmitted > 0 else 0
-                    max_transfer_rate = onu.max_allocated_bw
+            ft_total = self.history.ft_total
+            bw_excess = self.history.bw_excess
+            allocations = self.history.allocations.tolist()
+            for cycle in range(len(self.history)):
+                for index, onu_id in enumerate(self.history.onu_ids):
+                    ft1, ft2, ft3, ft4 = allocations[cycle][index]
+                    avg_latency = self.stats[index, AVG_LATENCY]
+                    max_transfer_rate = self.stats[index, MAX_RATE]
                     writer.writerow({
-                        'iteration': iteration,
+                        'iteration': cycle + 1,
                         'onu ID': onu_id,
                         'FT1': ft1,
                         'FT2': ft2,
                         'FT3': ft3,
                         'FT4': ft4,
-                        'FTtotal': fttotal,
-                        'BWexcess': self.components[onu_id].bandwidth - fttotal if fttotal < self.components[onu_id].bandwidth else 0,
+                        'FTtotal': ft_total[cycle, index],
+                        'BWexcess': bw_excess[cycle, index],
                         'Avg Latency': avg_latency,
                         'Max Transfer Rate': max_transfer_rate
                     })
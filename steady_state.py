@@ -0,0 +1,178 @@
+from statistics import NormalDist
+import numpy as np
+from dba import DBA_Simulator
+
+# Rows of a batch: summed allocation, summed latency and number of packets transmitted
+ALLOCATION = 0
+LATENCY = 1
+PACKETS = 2
+
+def t_quantile(p: float, dof: int) -> float:
+    # Student t quantile from the normal one (Cornish-Fisher expansion), within 0.2% of the
+    # exact value from 3 degrees of freedom on
+    z = NormalDist().inv_cdf(p)
+    g1 = (z**3 + z)/4
+    g2 = (5*z**5 + 16*z**3 + 3*z)/96
+    g3 = (3*z**7 + 19*z**5 + 17*z**3 - 15*z)/384
+    g4 = (79*z**9 + 776*z**7 + 1482*z**5 - 1920*z**3 - 945*z)/92160
+    return z + g1/dof + g2/dof**2 + g3/dof**3 + g4/dof**4
+
+class SteadyStateRule:
+    """
+    Batch-means stopping rule: the run is over once every per-ONU metric is known to a relative precision.
+
+    Every cycle adds the total allocation (FTtotal) of each ONU and the latency of the packets it
+    transmitted to the current batch. When there are 2*max_batches batches, neighbours are merged and
+    the batch size doubles, so memory stays bounded whatever the run length. At the end of every
+    batch the warm-up transient is cut with MSER (the truncation point that minimises the standard
+    error of the remaining batch means, searched over the first half of the run), and the run has
+    converged when at least min_batches batches are left and the confidence interval of every
+    metric is narrower than precision times its mean.
+
+    Latency is the mean over the packets of a batch. ONUs that never transmitted have no latency to
+    estimate and only their allocation is checked, but a batch without packets in the middle of
+    the kept ones holds the run.
+    """
+
+    def __init__(self, onu_ids: list[str], precision: float = 0.05, confidence: float = 0.95, batch_size: int = 10, min_batches: int = 10, max_batches: int = 40):
+        if not 0 < precision:
+            raise ValueError("The relative precision must be positive.")
+        if min_batches < 4 or max_batches < min_batches:
+            raise ValueError("At least 4 batches are needed, and max_batches cannot be below min_batches.")
+        self.onu_ids: list[str] = list(onu_ids)
+        self.onu_index: dict[str,int] = {onu_id: i for i, onu_id in enumerate(self.onu_ids)}
+        self.precision = precision
+        self.confidence = confidence
+        self.batch_size = batch_size
+        self.min_batches = min_batches
+        self.max_batches = max_batches
+
+        self.cycles: int = 0
+        self.warmup: int = 0  # Cycles discarded as warm-up at the last check
+        self.converged: bool = False
+        self.batches = np.zeros((2 * max_batches, 3, len(self.onu_ids)))
+        self.batch_count: int = 0
+        self._open = np.zeros((3, len(self.onu_ids)))  # Sums of the batch being filled
+        self._open_cycles: int = 0
+        self._latency = np.zeros(len(self.onu_ids))  # Running totals the last cycle was read from
+        self._packets = np.zeros(len(self.onu_ids))
+        self._estimates: tuple[np.ndarray, np.ndarray] | None = None
+
+    def observe(self, simulator: DBA_Simulator, allocations: dict[str,dict[int,float]]) -> bool:
+        """
+        Adds one simulated cycle.
+
+        Args:
+            simulator (DBA_Simulator): Simulator the cycle ran on, its latency totals are read.
+            allocations (dict[str,dict[int,float]]): Allocations of the cycle, as simulate_cycle returns them.
+
+        Returns:
+            bool: Whether the run has reached the requested precision.
+        """
+        for onu_id, alloc in allocations.items():
+            self._open[ALLOCATION, self.onu_index[onu_id]] += sum(alloc.values())
+        latency = np.fromiter((simulator.ONUs[onu_id].total_latency for onu_id in self.onu_ids), dtype=np.float64, count=len(self.onu_ids))
+        packets = np.fromiter((simulator.ONUs[onu_id].packets_transmitted for onu_id in self.onu_ids), dtype=np.float64, count=len(self.onu_ids))
+        self._open[LATENCY] += latency - self._latency
+        self._open[PACKETS] += packets - self._packets
+        self._latency, self._packets = latency, packets
+        self.cycles += 1
+        self._open_cycles += 1
+
+        if self._open_cycles == self.batch_size:
+            self._close_batch()
+            self.converged = self._check()
+        return self.converged
+
+    def _close_batch(self):
+        if self.batch_count == len(self.batches):
+            # Pairs of batches become one batch of twice the size
+            self.batches[:self.max_batches] = self.batches[0::2] + self.batches[1::2]
+            self.batches[self.max_batches:] = 0
+            self.batch_count = self.max_batches
+            self.batch_size *= 2
+            # The open batch was filled at the old size, it is the first half of the next one
+            return
+        self.batches[self.batch_count] = self._open
+        self.batch_count += 1
+        self._open[:] = 0
+        self._open_cycles = 0
+
+    def _batch_means(self) -> np.ndarray:
+        # batch x metric, allocation of every ONU followed by the latency of every ONU
+        batches = self.batches[:self.batch_count]
+        allocation = batches[:, ALLOCATION] / self.batch_size
+        with np.errstate(invalid='ignore', divide='ignore'):
+            latency = batches[:, LATENCY] / batches[:, PACKETS]
+        return np.concatenate((allocation, latency), axis=1)
+
+    def _truncation(self, means: np.ndarray) -> int:
+        # MSER over the first half of the batches, for every metric at once; the run keeps the
+        # latest truncation any metric asks for
+        k = len(means)
+        filled = np.nan_to_num(means)
+        suffix_sum = np.cumsum(filled[::-1], axis=0)[::-1]
+        suffix_squares = np.cumsum(filled[::-1]**2, axis=0)[::-1]
+        kept = (k - np.arange(k))[:, None]
+        mser = (suffix_squares - suffix_sum**2/kept) / kept**2
+        return int(mser[:k//2 + 1].argmin(axis=0).max())
+
+    def _check(self) -> bool:
+        if self.batch_count < self.min_batches:
+            return False
+        means = self._batch_means()
+        truncation = self._truncation(means)
+        kept = means[truncation:]
+        self.warmup = truncation * self.batch_size
+        if len(kept) < self.min_batches:
+            return False
+
+        # Latency of ONUs without a single packet is left out
+        measured = ~np.isnan(kept).all(axis=0)
+        if np.isnan(kept[:, measured]).any():
+            return False
+        mean = np.where(measured, np.nan_to_num(kept).mean(axis=0), 0)
+        half_width = t_quantile((1 + self.confidence)/2, len(kept) - 1) * np.nan_to_num(kept).std(axis=0, ddof=1) / np.sqrt(len(kept))
+        self._estimates = (mean, half_width)
+        return bool((half_width <= self.precision * np.abs(mean)).all())
+
+    def estimates(self) -> dict[str,tuple[float,float,float,float]]:
+        """
+        Point estimates after the warm-up, as of the last completed batch.
+
+        Returns:
+            dict[str,tuple[float,float,float,float]]: Per ONU, the mean allocation and its confidence
+            interval half-width, then the mean latency and its half-width (0, 0 without packets).
+        """
+        if self._estimates is None:
+            return {}
+        mean, half_width = self._estimates[0].tolist(), self._estimates[1].tolist()
+        n = len(self.onu_ids)
+        return {onu_id: (mean[i], half_width[i], mean[n + i], half_width[n + i]) for i, onu_id in enumerate(self.onu_ids)}
+
+def simulate_until_steady(simulator: DBA_Simulator, precision: float = 0.05, max_cycles: int = 100000, **options) -> SteadyStateRule:
+    # Runs until SteadyStateRule is met or max_cycles have been simulated, see rule.converged
+    rule = SteadyStateRule(list(simulator.ONUs), precision=precision, **options)
+    while rule.cycles < max_cycles:
+        if rule.observe(simulator, simulator.simulate_cycle()):
+            break
+    return rule
+
+
+if __name__ == "__main__":
+    # Usage example
+    from dba import ONU
+
+    ONUS = [
+        ONU("ONU1", 10, 1000, {1:0, 2:0.6, 3:0.2, 4:0.2}),
+        ONU("ONU2", 10, 1000, {1:0, 2:0.8, 3:0.0, 4:0.2}),
+        ONU("ONU3", 10, 2000, {1:0.2, 2:0.4, 3:0.2, 4:0.2}),
+        ONU("ONU4", 10, 2000, {1:0, 2:0.6, 3:0.2, 4:0.2})
+    ]
+
+    simulator = DBA_Simulator(ONUS, [["ONU1", "ONU2"], ["ONU3", "ONU4"]], 0.025)
+    rule = simulate_until_steady(simulator, precision=0.05, max_cycles=20000)
+    state = "Converged" if rule.converged else "Not converged"
+    print(f"{state} after {rule.cycles} cycles, warm-up {rule.warmup} cycles")
+    for onu_id, (allocation, allocation_hw, latency, latency_hw) in rule.estimates().items():
+        print(f"ONU {onu_id}: Allocation: {allocation:.2f} ± {allocation_hw:.2f}, Latency: {latency:.4f} ± {latency_hw:.4f}")
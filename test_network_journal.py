@@ -0,0 +1,75 @@
+import os
+from network_nodes import OLTNode, SplitterNode, Connection
+from network_journal import NetworkJournal
+
+def journal_with_olt(tmp_path) -> tuple[NetworkJournal, str]:
+    journal = NetworkJournal(str(tmp_path / 'network.csv'))
+    topology = journal.recover()
+    olt = OLTNode(1.0, 2.0, topology=topology)
+    journal.record_add(olt)
+    journal.close()
+    return journal, olt.id
+
+def test_torn_record_that_parses_is_dropped(tmp_path):
+    journal, olt_id = journal_with_olt(tmp_path)
+    # Crash in the middle of the longitude: the record still parses, with a truncated value
+    with open(journal.journal_path, 'a', newline='', encoding='utf-8') as journal_file:
+        journal_file.write('add;xyz;OLTNode;1.0;2')
+
+    journal = NetworkJournal(journal.snapshot_path)
+    topology = journal.recover()
+    assert 'xyz' not in topology
+    splitter = SplitterNode(3.0, 4.0, topology=topology)
+    journal.record_add(splitter)
+    journal.close()
+
+    # The edit made after the crash survives the next recovery
+    topology = NetworkJournal(journal.snapshot_path).recover()
+    assert set(topology) == {olt_id, splitter.id}
+    assert not os.path.exists(journal.journal_path + '.corrupt')
+
+def test_torn_record_with_missing_fields_is_dropped(tmp_path):
+    journal, olt_id = journal_with_olt(tmp_path)
+    with open(journal.journal_path, 'a', newline='', encoding='utf-8') as journal_file:
+        journal_file.write('add;xyz;OLTNode;1.0;2.0\r\n')
+
+    topology = NetworkJournal(journal.snapshot_path).recover()
+    assert set(topology) == {olt_id}
+    assert not os.path.exists(journal.journal_path + '.corrupt')
+
+def test_damaged_record_keeps_the_journal_aside(tmp_path):
+    journal, olt_id = journal_with_olt(tmp_path)
+    with open(journal.journal_path, 'a', newline='', encoding='utf-8') as journal_file:
+        journal_file.write('add;bad;Unknown;0;0;;;;;;;;\r\n')
+        journal_file.write('add;abc;SplitterNode;3.0;4.0;;;;;;;;\r\n')
+
+    topology = NetworkJournal(journal.snapshot_path).recover()
+    assert set(topology) == {olt_id, 'abc'}
+    assert os.path.exists(journal.journal_path + '.corrupt')
+
+def test_connection_length_is_read_back(tmp_path):
+    journal, olt_id = journal_with_olt(tmp_path)
+    with open(journal.journal_path, 'a', newline='', encoding='utf-8') as journal_file:
+        journal_file.write('add;abc;SplitterNode;3.0;4.0;;;;;;;;\r\n')
+        journal_file.write(f'add;edge;Connection;;;{olt_id};abc;12.5;;;;;\r\n')
+
+    # The stored length is used as is, no geodesic is computed on recovery
+    journal = NetworkJournal(journal.snapshot_path)
+    topology = journal.recover()
+    assert isinstance(topology['edge'], Connection)
+    assert topology['edge'].length == 12.5
+    journal.compact(topology)
+    journal.close()
+    assert NetworkJournal(journal.snapshot_path).recover()['edge'].length == 12.5
+
+def test_journal_with_old_columns_is_compacted(tmp_path):
+    journal = NetworkJournal(str(tmp_path / 'network.csv'))
+    with open(journal.journal_path, 'w', newline='', encoding='utf-8') as journal_file:
+        journal_file.write('Op;ID;Type;Latitude;Longitude;Start Node;End Node;Bandwidth;T-Cont1;T-Cont2;T-Cont3;T-Cont4\r\n')
+        journal_file.write('add;abc;SplitterNode;3.0;4.0;;;;;;;\r\n')
+
+    topology = journal.recover()
+    splitter = SplitterNode(5.0, 6.0, topology=topology)
+    journal.record_add(splitter)
+    journal.close()
+    assert set(NetworkJournal(journal.snapshot_path).recover()) == {'abc', splitter.id}